@@ -0,0 +1,137 @@
+import os
+import asyncio
+import hashlib
+import tempfile
+
+from bson import Binary
+from pymongo.errors import DuplicateKeyError
+
+CHUNK_SIZE = 256 * 1024
+
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF8", "image/gif"),
+    (b"BM", "image/bmp"),
+)
+
+
+def sniff_content_type(head: bytes) -> str:
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    for signature, content_type in _SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    return "application/octet-stream"
+
+
+class BlobNotFound(Exception):
+    pass
+
+
+class MongoBlobStore:
+    """Content-addressed blobs stored one document each, with the sha256 hex digest as _id.
+
+    Each write is a single insert keyed on the digest, so concurrent uploads of
+    the same bytes can't interleave the way GridFS chunk writes do: the loser
+    just gets a duplicate-key error. Blobs must fit in one BSON document.
+
+    Mongo can't slice a BinData field server-side, so a range read still
+    fetches the whole document; ranges only save bytes sent to the client.
+    Use LocalBlobStore where ranged reads of large blobs matter.
+    """
+
+    MAX_SIZE = 15 * 1024 * 1024
+
+    def __init__(self, db, collection: str = "blobs"):
+        self.collection = db[collection]
+
+    async def put(self, data: bytes) -> str:
+        if len(data) > self.MAX_SIZE:
+            raise ValueError(f"Blob of {len(data)} bytes exceeds {self.MAX_SIZE}")
+        digest = hashlib.sha256(data).hexdigest()
+        try:
+            await self.collection.insert_one({
+                "_id": digest,
+                "data": Binary(data),
+                "size": len(data),
+                "content_type": sniff_content_type(data[:16]),
+            })
+        except DuplicateKeyError:
+            pass
+        return digest
+
+    async def stat(self, digest: str) -> dict:
+        doc = await self.collection.find_one({"_id": digest}, {"size": 1, "content_type": 1})
+        if doc is None:
+            raise BlobNotFound(digest)
+        return {"digest": digest, "size": doc["size"], "content_type": doc["content_type"]}
+
+    async def stream(self, digest: str, start: int, end: int):
+        """Yield bytes [start, end] (inclusive) of a blob; reads the whole blob from Mongo."""
+        doc = await self.collection.find_one({"_id": digest}, {"data": 1})
+        if doc is None:
+            raise BlobNotFound(digest)
+        data = memoryview(doc["data"])
+        for offset in range(start, end + 1, CHUNK_SIZE):
+            yield bytes(data[offset:min(offset + CHUNK_SIZE, end + 1)])
+
+
+class LocalBlobStore:
+    """Same interface as MongoBlobStore, backed by files under `root`."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    def _write(self, digest: str, data: bytes):
+        path = self._path(digest)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    async def put(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        await asyncio.to_thread(self._write, digest, data)
+        return digest
+
+    def _stat(self, digest: str) -> dict:
+        try:
+            with open(self._path(digest), "rb") as f:
+                head = f.read(16)
+                size = os.fstat(f.fileno()).st_size
+        except FileNotFoundError:
+            raise BlobNotFound(digest)
+        return {"digest": digest, "size": size, "content_type": sniff_content_type(head)}
+
+    async def stat(self, digest: str) -> dict:
+        return await asyncio.to_thread(self._stat, digest)
+
+    def _read(self, digest: str, offset: int, size: int) -> bytes:
+        try:
+            with open(self._path(digest), "rb") as f:
+                f.seek(offset)
+                return f.read(size)
+        except FileNotFoundError:
+            raise BlobNotFound(digest)
+
+    async def stream(self, digest: str, start: int, end: int):
+        position = start
+        while position <= end:
+            chunk = await asyncio.to_thread(self._read, digest, position, min(CHUNK_SIZE, end - position + 1))
+            if not chunk:
+                break
+            position += len(chunk)
+            yield chunk
+
+
+def build_blob_store(db, backend: str, path: str):
+    if backend == "local":
+        return LocalBlobStore(path)
+    return MongoBlobStore(db, collection="report_images")
@@ -0,0 +1,81 @@
+import json
+
+
+class BodyTooLarge(Exception):
+    pass
+
+
+class BodySizeLimit:
+    """ASGI middleware that caps request bodies per path while they stream in.
+
+    `limits` maps a path to (max bytes, error detail). A declared Content-Length
+    over the cap is refused with 413 before any of the body is read. Otherwise
+    the body is counted as the app receives it, and the request is failed as
+    soon as it passes the cap, so an oversized multipart upload is never
+    spooled to disk in full.
+    """
+
+    def __init__(self, app, limits: dict):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope.get("path")) if scope["type"] == "http" else None
+        if limit is None:
+            return await self.app(scope, receive, send)
+        max_bytes, detail = limit
+
+        for name, value in scope.get("headers", []):
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    break
+                if declared > max_bytes:
+                    return await self.reject(send, detail)
+                break
+
+        received = 0
+        exceeded = False
+        started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_bytes:
+                    exceeded = True
+                    raise BodyTooLarge()
+            return message
+
+        async def guarded_send(message):
+            nonlocal started
+            if exceeded:
+                # The app turned the aborted body read into a response of its
+                # own (FastAPI reports it as a parse error); send the 413 instead.
+                if not started:
+                    started = True
+                    await self.reject(send, detail)
+                return
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            if not exceeded:
+                raise
+            if not started:
+                await self.reject(send, detail)
+
+    @staticmethod
+    async def reject(send, detail: str):
+        body = json.dumps({"detail": detail}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
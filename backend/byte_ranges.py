@@ -0,0 +1,36 @@
+import re
+
+_SPEC = re.compile(r"(\d*)-(\d*)")
+
+
+class RangeNotSatisfiable(ValueError):
+    pass
+
+
+def parse_range(header: str, size: int):
+    """(start, end) for a single `bytes=` range, or None if the header should be ignored.
+
+    Other units, multiple ranges and malformed specs are ignored, so the caller
+    serves the whole body (RFC 9110 section 14.2). RangeNotSatisfiable is only
+    raised for a well-formed range that starts past the end of the body.
+    """
+    unit, _, spec = header.partition("=")
+    match = _SPEC.fullmatch(spec.strip())
+    if unit.strip().lower() != "bytes" or match is None:
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = int(last) if last else size - 1
+        if last and end < start:
+            return None
+        if start >= size:
+            raise RangeNotSatisfiable(header)
+        return start, min(end, size - 1)
+    if not last:
+        return None
+    # Suffix range: the last N bytes.
+    length = int(last)
+    if length == 0 or size == 0:
+        raise RangeNotSatisfiable(header)
+    return max(size - length, 0), size - 1
@@ -0,0 +1,223 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Small in-process LRU cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, ttl: float, max_size: int = 1024):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None or entry[1] <= time.monotonic():
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def set(self, key, value, ttl: float = None):
+        self._data[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class SingleFlight:
+    """Collapses concurrent calls for the same key into one in-flight coroutine."""
+
+    def __init__(self):
+        self._calls = {}
+
+    def __contains__(self, key):
+        return key in self._calls
+
+    async def do(self, key, fn):
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        # Shield so one caller going away doesn't cancel the shared call.
+        return await asyncio.shield(task)
+
+
+class PerceptualHashCache:
+    """LRU cache keyed by an exact content hash, with near-duplicate lookup.
+
+    Entries also carry a 64-bit perceptual hash; a lookup that misses on the
+    exact hash falls back to the closest stored perceptual hash within
+    `max_distance` bits (Hamming distance).
+    """
+
+    def __init__(self, max_size: int = 2048, max_distance: int = 4):
+        self.max_size = max_size
+        self.max_distance = max_distance
+        self._data = OrderedDict()
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+
+    def get_exact(self, digest):
+        entry = self._data.get(digest)
+        if entry is None:
+            return None
+        self._data.move_to_end(digest)
+        self.exact_hits += 1
+        return entry[1]
+
+    def get_similar(self, phash):
+        best_key, best_distance = None, self.max_distance + 1
+        for key, (stored, _) in self._data.items():
+            distance = (stored ^ phash).bit_count()
+            if distance < best_distance:
+                best_key, best_distance = key, distance
+                if distance == 0:
+                    break
+        if best_key is None:
+            self.misses += 1
+            return None
+        self._data.move_to_end(best_key)
+        self.similar_hits += 1
+        return self._data[best_key][1]
+
+    def set(self, digest, phash, value):
+        self._data[digest] = (phash, value)
+        self._data.move_to_end(digest)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def stats(self) -> dict:
+        hits = self.exact_hits + self.similar_hits
+        lookups = hits + self.misses
+        return {
+            "size": len(self._data),
+            "exact_hits": self.exact_hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class StaleWhileRevalidateCache:
+    """Async cache that serves stale entries while refreshing them in the background.
+
+    `loader(key)` fetches a value. Entries are fresh for `ttl` seconds (a number
+    or a callable returning one), then served stale for up to `stale_ttl` more
+    seconds while a single background refresh runs. Concurrent misses for a key
+    share one load. Per-key hit counts drive `hottest()` for prefetching.
+    """
+
+    def __init__(self, loader, ttl, stale_ttl: float, max_size: int = 4096):
+        self.loader = loader
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._flight = SingleFlight()
+        self._heat = {}
+        self._refresh_tasks = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refresh_errors = 0
+
+    def _fresh_for(self) -> float:
+        return self.ttl() if callable(self.ttl) else self.ttl
+
+    async def _load(self, key):
+        value = await self.loader(key)
+        fresh_until = time.monotonic() + self._fresh_for()
+        self._data[key] = (value, fresh_until, fresh_until + self.stale_ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            evicted, _ = self._data.popitem(last=False)
+            self._heat.pop(evicted, None)
+        return value
+
+    async def _refresh_quietly(self, key):
+        try:
+            await self._flight.do(key, lambda: self._load(key))
+        except Exception as e:
+            self.refresh_errors += 1
+            logging.getLogger(__name__).warning(f"Background refresh failed for {key}: {e}")
+
+    def refresh_in_background(self, key):
+        if key in self._flight:
+            return
+        task = asyncio.ensure_future(self._refresh_quietly(key))
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+    async def get(self, key):
+        self._heat[key] = self._heat.get(key, 0) + 1
+        entry = self._data.get(key)
+        now = time.monotonic()
+        if entry is not None:
+            value, fresh_until, stale_until = entry
+            if now < fresh_until:
+                self.hits += 1
+                self._data.move_to_end(key)
+                return value
+            if now < stale_until:
+                self.stale_hits += 1
+                self.refresh_in_background(key)
+                return value
+
+        self.misses += 1
+        try:
+            return await self._flight.do(key, lambda: self._load(key))
+        except Exception:
+            # An expired entry is still better than an error.
+            if entry is not None:
+                return entry[0]
+            raise
+
+    def expires_within(self, key, seconds: float) -> bool:
+        entry = self._data.get(key)
+        return entry is None or entry[1] - time.monotonic() <= seconds
+
+    def hottest(self, n: int):
+        return sorted(self._heat, key=self._heat.get, reverse=True)[:n]
+
+    def decay_heat(self):
+        self._heat = {k: v // 2 for k, v in self._heat.items() if v > 1}
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refresh_errors": self.refresh_errors,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,206 @@
+import os
+import threading
+os.environ.setdefault("TF_ENABLE_ONEDNN_OPTS", "0")
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+import numpy as np
+
+from imaging import TARGET_SIZE, normalize_into
+from inference import ModelRegistry
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODELS_DIR = os.path.join(BASE_DIR, "models")
+
+# INFERENCE_BACKEND=keras  - full TensorFlow, original .keras/.h5 files (default).
+# INFERENCE_BACKEND=tflite - quantized files produced by models/export_models.py,
+#                            served with tflite-runtime (no tensorflow-cpu needed).
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "keras").lower()
+TFLITE_QUANTIZATION = os.environ.get("TFLITE_QUANTIZATION", "float16")
+# Largest micro-batch the server or sidecar sends (same setting as theirs).
+MAX_BATCH = int(os.environ.get("INFERENCE_MAX_BATCH", 16))
+
+MODEL_FILES = {
+    "crop": "crop_classifier_fixed.keras",
+    "corn": "corn_disease_model.h5",
+    "cotton": "cotton_disease_model.h5",
+}
+
+crop_classes = ['Corn', 'Cotton', 'Wheat']
+corn_diseases = ['Blight', 'Common_Rust', 'Gray_Leaf_Spot', 'Healthy']
+cotton_diseases = ['Bacterial_Blight', 'Curl_Virus', 'Fusarium_Wilt', 'Healthy']
+
+
+def tflite_path(name, quantization=TFLITE_QUANTIZATION):
+    return os.path.join(MODELS_DIR, f"{name}_{quantization}.tflite")
+
+
+def load_keras_model(path):
+    import tensorflow as tf
+    return tf.keras.models.load_model(path, compile=False)
+
+
+class KerasBackend:
+    def __init__(self, model):
+        self.model = model
+
+    def predict(self, batch):
+        return self.model(batch, training=False).numpy()
+
+
+class TFLiteBackend:
+    """Runs a .tflite model from a pool of interpreters shared by every thread.
+
+    Interpreters aren't thread-safe, so each call checks one out. Batches are
+    zero-padded up to the next power of two and idle interpreters are pooled per
+    padded size, so varying micro-batch sizes never pay for
+    resize_tensor_input + allocate_tensors after the first time, and the number
+    of tensor arenas follows how many batches run at once, not threads x sizes.
+    """
+
+    def __init__(self, path, max_batch: int = 1):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+        self._interpreter_cls = Interpreter
+        self.path = path
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        self._idle = {}
+
+    def _new_interpreter(self, batch_size):
+        interpreter = self._interpreter_cls(model_path=self.path)
+        input_detail = interpreter.get_input_details()[0]
+        if input_detail["shape"][0] != batch_size:
+            interpreter.resize_tensor_input(input_detail["index"], [batch_size, *input_detail["shape"][1:]])
+        interpreter.allocate_tensors()
+        return interpreter
+
+    def _checkout(self, batch_size):
+        with self._lock:
+            idle = self._idle.get(batch_size)
+            if idle:
+                return idle.pop()
+        return self._new_interpreter(batch_size)
+
+    def _checkin(self, batch_size, interpreter):
+        with self._lock:
+            self._idle.setdefault(batch_size, []).append(interpreter)
+
+    def warmup(self):
+        """Allocate and run one interpreter for every padded size up to max_batch."""
+        size = 1
+        while True:
+            self.predict(np.zeros((size, *TARGET_SIZE, 3), dtype=np.float32))
+            if size >= self.max_batch:
+                break
+            size *= 2
+
+    def predict(self, batch):
+        size = len(batch)
+        padded = 1 << (size - 1).bit_length()
+        if padded != size:
+            batch = np.concatenate([batch, np.zeros((padded - size, *batch.shape[1:]), dtype=batch.dtype)])
+        interpreter = self._checkout(padded)
+        try:
+            input_detail = interpreter.get_input_details()[0]
+            if input_detail["dtype"] in (np.int8, np.uint8):
+                scale, zero_point = input_detail["quantization"]
+                info = np.iinfo(input_detail["dtype"])
+                batch = np.clip(np.round(batch / scale + zero_point), info.min, info.max)
+                batch = batch.astype(input_detail["dtype"])
+            interpreter.set_tensor(input_detail["index"], batch)
+            interpreter.invoke()
+
+            output_detail = interpreter.get_output_details()[0]
+            output = interpreter.get_tensor(output_detail["index"])[:size]
+        finally:
+            self._checkin(padded, interpreter)
+        if output_detail["dtype"] in (np.int8, np.uint8):
+            scale, zero_point = output_detail["quantization"]
+            output = (output.astype(np.float32) - zero_point) * scale
+        return output
+
+
+def model_loader(name):
+    def load():
+        if INFERENCE_BACKEND == "tflite":
+            path = tflite_path(name)
+        else:
+            path = os.path.join(MODELS_DIR, MODEL_FILES[name])
+        if not os.path.exists(path):
+            raise RuntimeError(f"{os.path.basename(path)} NOT FOUND")
+        if INFERENCE_BACKEND == "tflite":
+            return TFLiteBackend(path, max_batch=MAX_BATCH)
+        return KerasBackend(load_keras_model(path))
+    return load
+
+
+def warmup_model(model):
+    if isinstance(model, TFLiteBackend):
+        model.warmup()
+    else:
+        model.predict(np.zeros((1, *TARGET_SIZE, 3), dtype=np.float32))
+
+
+model_registry = ModelRegistry()
+for _name in MODEL_FILES:
+    model_registry.register(_name, model_loader(_name), warmup=warmup_model)
+
+
+def load_crop_model():
+    return model_registry.get("crop")
+
+def load_corn_model():
+    return model_registry.get("corn")
+
+def load_cotton_model():
+    return model_registry.get("cotton")
+
+
+DISEASE_MODELS = {
+    "Corn": (load_corn_model, corn_diseases),
+    "Cotton": (load_cotton_model, cotton_diseases),
+}
+
+
+_buffers = threading.local()
+
+
+def input_buffer(size):
+    """Per-thread float32 input buffer, reused across batches and grown on demand."""
+    buffer = getattr(_buffers, "batch", None)
+    if buffer is None or len(buffer) < size:
+        buffer = np.empty((size, *TARGET_SIZE, 3), dtype=np.float32)
+        _buffers.batch = buffer
+    return buffer
+
+
+def predict_batch(images):
+    """Classify a list of uint8 224x224 images with one crop pass and one pass per crop."""
+    batch = normalize_into(images, input_buffer(len(images)))
+    crop_preds = load_crop_model().predict(batch)
+    crop_indices = np.argmax(crop_preds, axis=1)
+
+    results = [None] * len(images)
+    by_crop = {}
+    for i, crop_index in enumerate(crop_indices):
+        crop_name = crop_classes[int(crop_index)]
+        crop_confidence = float(crop_preds[i, crop_index]) * 100
+        if crop_name in DISEASE_MODELS:
+            by_crop.setdefault(crop_name, []).append(i)
+            results[i] = (crop_name, crop_confidence)
+        else:
+            results[i] = (crop_name, crop_confidence, "Healthy", 100.0)
+
+    # Fan out to the per-crop disease classifiers, one batch each.
+    for crop_name, indices in by_crop.items():
+        load_model, classes = DISEASE_MODELS[crop_name]
+        subset = batch if len(indices) == len(images) else batch[indices]
+        dis_preds = load_model().predict(subset)
+        for i, dis_pred in zip(indices, dis_preds):
+            dis_index = int(np.argmax(dis_pred))
+            results[i] = results[i] + (classes[dis_index], float(dis_pred[dis_index]) * 100)
+
+    return results
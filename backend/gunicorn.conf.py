@@ -0,0 +1,60 @@
+# Gunicorn settings for the FastAPI app (picked up automatically from the working directory).
+#
+# With INFERENCE_MODE=sidecar the master starts a single inference_sidecar.py
+# process before forking workers, so the classifiers are held in memory once
+# instead of once per worker. A monitor thread in the master restarts the
+# sidecar if it exits. Preloading TensorFlow in the master and forking is not
+# supported: TF's thread pools do not survive fork().
+import os
+import subprocess
+import sys
+import threading
+import time
+
+SIDECAR_CHECK_INTERVAL = float(os.environ.get("SIDECAR_CHECK_INTERVAL", 2))
+SIDECAR_MAX_BACKOFF = 60
+
+_sidecar = None
+_launched_at = 0.0
+_stopping = threading.Event()
+
+
+def _start_sidecar(server):
+    global _sidecar, _launched_at
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "inference_sidecar.py")
+    _sidecar = subprocess.Popen([sys.executable, script])
+    _launched_at = time.monotonic()
+    server.log.info(f"Started inference sidecar (pid {_sidecar.pid})")
+
+
+def _monitor_sidecar(server):
+    backoff = 0.5
+    while not _stopping.wait(SIDECAR_CHECK_INTERVAL):
+        code = _sidecar.poll()
+        if code is None:
+            continue
+        # Back off while it keeps crashing soon after start (e.g. a broken model file).
+        backoff = min(backoff * 2, SIDECAR_MAX_BACKOFF) if time.monotonic() - _launched_at < 30 else 1
+        server.log.error(f"Inference sidecar exited with code {code}; restarting in {backoff}s")
+        if _stopping.wait(backoff):
+            return
+        _start_sidecar(server)
+
+
+def on_starting(server):
+    if os.environ.get("INFERENCE_MODE", "local").lower() != "sidecar":
+        return
+    _start_sidecar(server)
+    threading.Thread(target=_monitor_sidecar, args=(server,), name="sidecar-monitor", daemon=True).start()
+
+
+def on_exit(server):
+    _stopping.set()
+    if _sidecar is None or _sidecar.poll() is not None:
+        return
+    _sidecar.terminate()
+    try:
+        _sidecar.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        _sidecar.kill()
+    server.log.info("Inference sidecar stopped")
@@ -0,0 +1,16 @@
+import math
+
+
+def heat_cell(lat: float, lng: float, grid: float):
+    """Integer (row, col) of the `grid`-degree cell containing a point.
+
+    Rounding the quotient before flooring keeps points on a cell boundary in the
+    cell they start: 21.2 / 0.1 is 211.99999999999997 in floating point, which a
+    bare floor would put in row 211.
+    """
+    return math.floor(round(lat / grid, 9)), math.floor(round(lng / grid, 9))
+
+
+def cell_corner(index: int, grid: float) -> float:
+    """Degrees of a cell index's south (row) or west (col) edge."""
+    return round(index * grid, 6)
@@ -0,0 +1,69 @@
+import io
+import hashlib
+
+import numpy as np
+from PIL import Image
+
+TARGET_SIZE = (224, 224)
+_SCALE = np.float32(1 / 255)
+
+
+def preprocess_image(fileobj):
+    """Decode an upload to a 224x224 RGB uint8 array without a full-resolution copy.
+
+    For JPEGs `draft()` makes libjpeg decode at the smallest DCT scale that is
+    still >= the target size, and `reduce()` box-downsamples other formats by an
+    integer factor before the final resize, so a 12 MP photo never becomes a
+    12 MP RGB buffer.
+    """
+    with Image.open(fileobj) as img:
+        img.draft("RGB", TARGET_SIZE)
+        if img.mode not in ("RGB", "RGBA", "L"):
+            img = img.convert("RGB")
+        factor = min(img.width // TARGET_SIZE[0], img.height // TARGET_SIZE[1])
+        if factor >= 2:
+            img = img.reduce(factor)
+        img = img.convert("RGB").resize(TARGET_SIZE)
+        return np.asarray(img, dtype=np.uint8)
+
+
+def file_digest(fileobj, chunk_size: int = 64 * 1024) -> str:
+    """sha256 hex digest of a whole upload, wherever its position was left."""
+    fileobj.seek(0)
+    digest = hashlib.sha256()
+    while chunk := fileobj.read(chunk_size):
+        digest.update(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
+def make_thumbnail(fileobj, quality: int = 85) -> bytes:
+    """JPEG that fits in 224x224, decoded at reduced scale like preprocess_image."""
+    with Image.open(fileobj) as img:
+        img.draft("RGB", TARGET_SIZE)
+        img = img.convert("RGB")
+        img.thumbnail(TARGET_SIZE)
+        out = io.BytesIO()
+        img.save(out, "JPEG", quality=quality, optimize=True)
+        return out.getvalue()
+
+
+def normalize_into(images, out):
+    """Scale uint8 images to float32 [0, 1] directly into `out` (no temporaries)."""
+    batch = out[:len(images)]
+    for i, image in enumerate(images):
+        np.multiply(image, _SCALE, out=batch[i], casting="unsafe")
+    return batch
+
+
+def normalize(images):
+    out = np.empty((len(images), *TARGET_SIZE, 3), dtype=np.float32)
+    return normalize_into(images, out)
+
+
+def perceptual_hash(image):
+    """64-bit difference hash (dHash) of a decoded image array."""
+    gray = Image.fromarray(image).convert("L").resize((9, 8), Image.BILINEAR)
+    pixels = np.asarray(gray, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
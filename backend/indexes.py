@@ -0,0 +1,55 @@
+import logging
+
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+
+async def apply_indexes(db, declared: dict) -> list:
+    """Create every declared index; returns the collections that failed.
+
+    `declared` maps collection names to lists of `pymongo.IndexModel`.
+    create_indexes is a no-op for indexes that already exist with the same
+    spec, so this is safe to run on every startup. One collection failing
+    (say, duplicate firebase_uids blocking a unique index) doesn't stop the rest.
+    """
+    failed = []
+    for collection, models in declared.items():
+        try:
+            await db[collection].create_indexes(models)
+        except OperationFailure as e:
+            logger.error(f"Could not create indexes on {collection}: {e}")
+            failed.append(collection)
+    return failed
+
+
+def plan_stages(plan: dict):
+    yield plan.get("stage")
+    if "inputStage" in plan:
+        yield from plan_stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        yield from plan_stages(child)
+    if "queryPlan" in plan:
+        yield from plan_stages(plan["queryPlan"])
+
+
+async def check_query_shapes(db, shapes: list) -> list:
+    """Run explain() on each (name, collection, filter, sort[, collation]) and flag unindexed ones.
+
+    A shape is flagged when its winning plan has a COLLSCAN, or a blocking
+    SORT stage, i.e. an index exists for the filter but not for the order.
+    Queries that run with a collation only use indexes with the same one, so
+    such shapes must be checked with it.
+    """
+    unindexed = []
+    for name, collection, query, sort, *collation in shapes:
+        cursor = db[collection].find(query, collation=collation[0] if collation else None)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = await cursor.explain()
+        stages = set(plan_stages(explain["queryPlanner"]["winningPlan"]))
+        problems = sorted(stages & {"COLLSCAN", "SORT"})
+        if problems:
+            logger.warning(f"Query shape '{name}' on {collection} is not indexed ({', '.join(problems)})")
+            unindexed.append({"name": name, "collection": collection, "stages": problems})
+    return unindexed
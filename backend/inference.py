@@ -0,0 +1,368 @@
+import os
+import json
+import time
+import struct
+import asyncio
+import logging
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class InferenceSaturated(Exception):
+    """Raised when the inference queue is full and the caller should retry later."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Inference queue is full")
+        self.retry_after = retry_after
+
+
+class InferenceUnavailable(InferenceSaturated):
+    """Raised when the inference sidecar can't be reached (crashed or restarting)."""
+
+    def __init__(self, retry_after: int):
+        Exception.__init__(self, "Inference sidecar is not running")
+        self.retry_after = retry_after
+
+
+class InferenceExecutor:
+    """Runs blocking model calls off the event loop on a bounded worker pool.
+
+    `max_queue` caps how many jobs may be waiting or running at once; anything
+    beyond that is rejected with `InferenceSaturated` instead of queueing.
+    """
+
+    def __init__(self, max_workers: int = None, max_queue: int = None, retry_after: int = 5):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue or self.max_workers * 4
+        self.retry_after = retry_after
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="inference",
+        )
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._pending - self._running
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "queue_depth": self.queue_depth,
+            "running": self._running,
+            "completed": self._completed,
+            "rejected": self._rejected,
+        }
+
+    def _reserve(self):
+        with self._lock:
+            if self._pending >= self.max_queue:
+                self._rejected += 1
+                raise InferenceSaturated(self.retry_after)
+            self._pending += 1
+
+    def _run(self, fn, args):
+        with self._lock:
+            self._running += 1
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._pending -= 1
+                self._completed += 1
+
+    async def run(self, fn, *args):
+        self._reserve()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, self._run, fn, args)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class MicroBatcher:
+    """Groups concurrent single-image requests into one batched forward pass.
+
+    Items are collected until `max_batch` are waiting or `max_wait_ms` has
+    elapsed since the first one arrived, then `forward_fn` is run on the
+    executor with the list of items and must return one result per item.
+    """
+
+    def __init__(self, executor: InferenceExecutor, forward_fn, max_batch: int = 16,
+                 max_wait_ms: float = 10, max_pending: int = None):
+        self.executor = executor
+        self.forward_fn = forward_fn
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000
+        self.max_pending = max_pending or self.max_batch * executor.max_queue
+        self._queue = None
+        self._task = None
+        self._inflight = set()
+        self._pending = 0
+        self._batches = 0
+        self._items = 0
+        self._size_histogram = {}
+
+    def stats(self) -> dict:
+        return {
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+            "pending": self._pending,
+            "batches": self._batches,
+            "items": self._items,
+            "avg_batch_size": round(self._items / self._batches, 2) if self._batches else 0.0,
+            "batch_size_histogram": dict(sorted(self._size_histogram.items())),
+        }
+
+    def start(self):
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._collect())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def submit(self, item):
+        if self._pending >= self.max_pending:
+            raise InferenceSaturated(self.executor.retry_after)
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._pending += 1
+        await self._queue.put((item, future))
+        try:
+            return await future
+        finally:
+            self._pending -= 1
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Callers that gave up while queued don't need a forward pass.
+            batch = [(item, fut) for item, fut in batch if not fut.done()]
+            if not batch:
+                continue
+            task = loop.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch):
+        size = len(batch)
+        self._batches += 1
+        self._items += size
+        self._size_histogram[size] = self._size_histogram.get(size, 0) + 1
+        try:
+            results = await self.executor.run(self.forward_fn, [item for item, _ in batch])
+        except Exception as e:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        for (_, fut), result in zip(batch, results):
+            if not fut.done():
+                fut.set_result(result)
+
+
+class ModelRegistry:
+    """Loads named models exactly once, thread-safely, and tracks their status.
+
+    Each model is registered with a loader and an optional warm-up callable that
+    runs one dummy inference so graph tracing is paid before real traffic.
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._locks = {}
+        self._status = {}
+
+    def register(self, name: str, loader, warmup=None):
+        self._loaders[name] = (loader, warmup)
+        self._locks[name] = threading.Lock()
+        self._status[name] = {"state": "pending"}
+
+    def get(self, name: str):
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        with self._locks[name]:
+            # Another thread may have finished loading while we waited.
+            model = self._models.get(name)
+            if model is None:
+                model = self._load(name)
+            return model
+
+    def _load(self, name: str):
+        loader, warmup = self._loaders[name]
+        status = self._status[name]
+        status.update(state="loading", error=None)
+        try:
+            started = time.perf_counter()
+            model = loader()
+            status["load_seconds"] = round(time.perf_counter() - started, 3)
+            if warmup is not None:
+                started = time.perf_counter()
+                warmup(model)
+                status["warmup_seconds"] = round(time.perf_counter() - started, 3)
+        except Exception as e:
+            status.update(state="failed", error=str(e))
+            raise
+        self._models[name] = model
+        status.update(state="loaded", loaded_at=time.time())
+        return model
+
+    def load_all(self):
+        for name in self._loaders:
+            try:
+                self.get(name)
+            except Exception:
+                logging.exception(f"Failed to load model '{name}'")
+
+    @property
+    def ready(self) -> bool:
+        return all(s["state"] == "loaded" for s in self._status.values())
+
+    @property
+    def state(self) -> str:
+        states = {s["state"] for s in self._status.values()}
+        if states == {"loaded"}:
+            return "loaded"
+        if "failed" in states:
+            return "failed"
+        if "loading" in states or "loaded" in states:
+            return "loading"
+        return "pending"
+
+    def status(self) -> dict:
+        return {name: dict(s) for name, s in self._status.items()}
+
+
+# ---------- Sidecar IPC ----------
+# Frames are: 8-byte header (JSON length, payload length) + JSON + raw payload.
+# Image tensors travel as raw bytes in the payload; everything else is JSON.
+
+_FRAME_HEADER = struct.Struct(">II")
+
+
+def write_frame(writer, message: dict, payload: bytes = b""):
+    header = json.dumps(message).encode()
+    writer.write(_FRAME_HEADER.pack(len(header), len(payload)) + header + payload)
+
+
+async def read_frame(reader):
+    header_len, payload_len = _FRAME_HEADER.unpack(await reader.readexactly(_FRAME_HEADER.size))
+    message = json.loads(await reader.readexactly(header_len))
+    payload = await reader.readexactly(payload_len) if payload_len else b""
+    return message, payload
+
+
+class SidecarClient:
+    """Web-worker side of the shared inference process.
+
+    Requests are multiplexed over one Unix socket connection per worker and
+    matched to responses by id, so concurrent uploads from this worker land in
+    the same sidecar batch window as uploads from every other worker.
+    """
+
+    def __init__(self, socket_path: str, retry_after: int = 5, timeout: float = 30):
+        self.socket_path = socket_path
+        self.retry_after = retry_after
+        self.timeout = timeout
+        self._reader = None
+        self._writer = None
+        self._read_task = None
+        self._connect_lock = asyncio.Lock()
+        self._write_lock = asyncio.Lock()
+        self._waiters = {}
+        self._ids = itertools.count()
+
+    async def _ensure_connected(self):
+        if self._writer is not None and not self._writer.is_closing():
+            return
+        async with self._connect_lock:
+            if self._writer is not None and not self._writer.is_closing():
+                return
+            try:
+                self._reader, self._writer = await asyncio.open_unix_connection(self.socket_path)
+            except (FileNotFoundError, ConnectionRefusedError):
+                # Sidecar is starting, restarting or gone; callers may retry like a
+                # full queue, but health checks report it as down.
+                raise InferenceUnavailable(self.retry_after)
+            self._read_task = asyncio.get_running_loop().create_task(self._read_loop(self._reader))
+
+    async def _read_loop(self, reader):
+        try:
+            while True:
+                message, _ = await read_frame(reader)
+                waiter = self._waiters.pop(message.get("id"), None)
+                if waiter is not None and not waiter.done():
+                    waiter.set_result(message)
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            logging.warning(f"Inference sidecar connection lost: {e}")
+        finally:
+            if self._writer is not None:
+                self._writer.close()
+            # In-flight requests died with the sidecar (or its connection); report
+            # that like an unreachable sidecar so callers retry instead of failing.
+            for waiter in self._waiters.values():
+                if not waiter.done():
+                    waiter.set_exception(InferenceUnavailable(self.retry_after))
+            self._waiters.clear()
+
+    async def _request(self, message: dict, payload: bytes = b""):
+        await self._ensure_connected()
+        request_id = next(self._ids)
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[request_id] = waiter
+        try:
+            async with self._write_lock:
+                write_frame(self._writer, {**message, "id": request_id}, payload)
+                await self._writer.drain()
+            return await asyncio.wait_for(waiter, self.timeout)
+        except (ConnectionError, asyncio.TimeoutError):
+            # A broken pipe, or no answer in time: the sidecar is hung or restarting.
+            raise InferenceUnavailable(self.retry_after)
+        finally:
+            self._waiters.pop(request_id, None)
+
+    async def submit(self, array):
+        response = await self._request(
+            {"op": "predict", "dtype": str(array.dtype), "shape": list(array.shape)},
+            array.tobytes(),
+        )
+        if response.get("saturated"):
+            raise InferenceSaturated(response.get("retry_after", self.retry_after))
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        return tuple(response["result"])
+
+    async def status(self) -> dict:
+        return await self._request({"op": "status"})
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._read_task is not None:
+            self._read_task.cancel()
@@ -0,0 +1,105 @@
+"""Shared inference process for INFERENCE_MODE=sidecar.
+
+Holds the only copy of the crop/corn/cotton classifiers and serves every
+gunicorn worker over a Unix socket, so model memory no longer scales with the
+number of web workers. Started by gunicorn.conf.py, or run directly:
+
+    python inference_sidecar.py
+"""
+import os
+import asyncio
+import logging
+
+import numpy as np
+
+import classifier
+from inference import InferenceExecutor, InferenceSaturated, MicroBatcher, read_frame, write_frame
+
+SOCKET_PATH = os.environ.get("INFERENCE_SOCKET", "/tmp/farmerhelp-inference.sock")
+
+logger = logging.getLogger("inference_sidecar")
+
+executor = InferenceExecutor(
+    max_workers=int(os.environ.get("INFERENCE_WORKERS", 0)) or None,
+    max_queue=int(os.environ.get("INFERENCE_MAX_QUEUE", 0)) or None,
+    retry_after=int(os.environ.get("INFERENCE_RETRY_AFTER", 5)),
+)
+batcher = MicroBatcher(
+    executor,
+    classifier.predict_batch,
+    max_batch=int(os.environ.get("INFERENCE_MAX_BATCH", 16)),
+    max_wait_ms=float(os.environ.get("INFERENCE_MAX_WAIT_MS", 10)),
+)
+
+
+async def handle_predict(message, payload):
+    array = np.frombuffer(payload, dtype=message["dtype"]).reshape(message["shape"])
+    try:
+        return {"result": list(await batcher.submit(array))}
+    except InferenceSaturated as e:
+        return {"saturated": True, "retry_after": e.retry_after}
+    except Exception as e:
+        logger.exception("Sidecar prediction failed")
+        return {"error": str(e)}
+
+
+def status():
+    return {
+        "ready": classifier.model_registry.ready,
+        "state": classifier.model_registry.state,
+        "backend": classifier.INFERENCE_BACKEND,
+        "models": classifier.model_registry.status(),
+        "inference": executor.stats(),
+        "batching": batcher.stats(),
+        "pid": os.getpid(),
+    }
+
+
+async def handle_connection(reader, writer):
+    write_lock = asyncio.Lock()
+    tasks = set()
+
+    async def respond(message, payload):
+        if message.get("op") == "predict":
+            response = await handle_predict(message, payload)
+        elif message.get("op") == "status":
+            response = status()
+        else:
+            response = {"error": f"unknown op {message.get('op')!r}"}
+        async with write_lock:
+            write_frame(writer, {**response, "id": message.get("id")})
+            await writer.drain()
+
+    try:
+        while True:
+            message, payload = await read_frame(reader)
+            task = asyncio.ensure_future(respond(message, payload))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
+        writer.close()
+
+
+async def main():
+    if os.path.exists(SOCKET_PATH):
+        os.unlink(SOCKET_PATH)
+    batcher.start()
+    server = await asyncio.start_unix_server(handle_connection, path=SOCKET_PATH)
+    logger.info(f"Inference sidecar listening on {SOCKET_PATH} (pid {os.getpid()})")
+    # Serve straight away; requests wait on the registry lock until models are warm.
+    await asyncio.to_thread(classifier.model_registry.load_all)
+    logger.info(f"Models ready: {classifier.model_registry.state}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    asyncio.run(main())
@@ -0,0 +1,44 @@
+import hashlib
+from datetime import datetime, timezone
+
+MARKET_DATE_FORMAT = "%d/%m/%Y"
+# Everything else in a row is part of its _id.
+MARKET_PRICE_FIELDS = ("min_price", "max_price", "modal_price")
+
+
+def parse_price(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def normalize_market_record(record: dict):
+    """A market_prices document for one data.gov.in record, or None if it has no usable arrival date.
+
+    `_id` hashes the record's natural key, so re-syncing a row overwrites it.
+    """
+    try:
+        arrival_date = datetime.strptime(record["arrival_date"], MARKET_DATE_FORMAT).replace(tzinfo=timezone.utc)
+    except (KeyError, TypeError, ValueError):
+        return None
+    doc = {
+        "state": record.get("state"),
+        "district": record.get("district"),
+        "market": record.get("market"),
+        "commodity": record.get("commodity"),
+        "variety": record.get("variety"),
+        "grade": record.get("grade"),
+        "arrival_date": arrival_date,
+        "min_price": parse_price(record.get("min_price")),
+        "max_price": parse_price(record.get("max_price")),
+        "modal_price": parse_price(record.get("modal_price")),
+    }
+    natural_key = "|".join(str(doc[k]) for k in ("state", "district", "market", "commodity", "variety", "grade"))
+    doc["_id"] = hashlib.sha1(f"{natural_key}|{record['arrival_date']}".encode()).hexdigest()
+    return doc
+
+
+def market_row_changed(stored, doc: dict) -> bool:
+    """Whether `doc` is new (`stored` is None) or has different prices than the stored row."""
+    return stored is None or any(stored.get(field) != doc[field] for field in MARKET_PRICE_FIELDS)
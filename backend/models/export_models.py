@@ -0,0 +1,150 @@
+"""Export the Keras classifiers to quantized TFLite and check accuracy parity.
+
+Usage (from backend/):
+
+    python models/export_models.py --quantization float16
+    python models/export_models.py --quantization int8 --calibration-dir data/calibration
+    python models/export_models.py --quantization int8 --parity-dir data/holdout
+
+Writes models/<name>_<quantization>.tflite for crop, corn and cotton, which
+the server loads with INFERENCE_BACKEND=tflite TFLITE_QUANTIZATION=<quantization>.
+
+--parity-dir is a held-out set laid out as <parity-dir>/<model>/<class>/*.jpg
+(e.g. holdout/crop/Corn/..., holdout/corn/Blight/...). For each model the
+script reports Keras vs TFLite top-1 agreement and accuracy, and exits
+non-zero if agreement falls below --min-agreement.
+"""
+import argparse
+import json
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import numpy as np
+import tensorflow as tf
+
+import classifier
+from imaging import normalize, preprocess_image
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+CLASS_NAMES = {
+    "crop": classifier.crop_classes,
+    "corn": classifier.corn_diseases,
+    "cotton": classifier.cotton_diseases,
+}
+
+
+def list_images(directory):
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                yield os.path.join(root, name)
+
+
+def load_image(path):
+    with open(path, "rb") as f:
+        return preprocess_image(f)
+
+
+def representative_dataset(calibration_dir, limit=200):
+    def generator():
+        for i, path in enumerate(list_images(calibration_dir)):
+            if i >= limit:
+                break
+            yield [normalize([load_image(path)])]
+    return generator
+
+
+def export(name, quantization, calibration_dir=None):
+    keras_path = os.path.join(classifier.MODELS_DIR, classifier.MODEL_FILES[name])
+    model = classifier.load_keras_model(keras_path)
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantization == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == "int8":
+        if not calibration_dir:
+            raise SystemExit("int8 quantization needs --calibration-dir with sample leaf images")
+        converter.representative_dataset = representative_dataset(calibration_dir)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+
+    out_path = classifier.tflite_path(name, quantization)
+    with open(out_path, "wb") as f:
+        f.write(converter.convert())
+
+    print(f"✅ {name}: {os.path.getsize(keras_path) / 1e6:.1f} MB -> "
+          f"{os.path.getsize(out_path) / 1e6:.1f} MB ({os.path.basename(out_path)})")
+    return model, out_path
+
+
+def check_parity(name, keras_model, tflite_file, parity_dir, batch_size=32):
+    keras_backend = classifier.KerasBackend(keras_model)
+    tflite_backend = classifier.TFLiteBackend(tflite_file)
+    classes = CLASS_NAMES[name]
+
+    samples = []
+    model_dir = os.path.join(parity_dir, name)
+    for label in classes:
+        label_dir = os.path.join(model_dir, label)
+        if os.path.isdir(label_dir):
+            samples.extend((path, classes.index(label)) for path in list_images(label_dir))
+    if not samples:
+        print(f"⚠ {name}: no held-out images under {model_dir}")
+        return None
+
+    agree = keras_correct = tflite_correct = 0
+    for start in range(0, len(samples), batch_size):
+        chunk = samples[start:start + batch_size]
+        batch = normalize([load_image(path) for path, _ in chunk])
+        labels = np.array([label for _, label in chunk])
+        keras_top1 = np.argmax(keras_backend.predict(batch), axis=1)
+        tflite_top1 = np.argmax(tflite_backend.predict(batch), axis=1)
+        agree += int(np.sum(keras_top1 == tflite_top1))
+        keras_correct += int(np.sum(keras_top1 == labels))
+        tflite_correct += int(np.sum(tflite_top1 == labels))
+
+    total = len(samples)
+    result = {
+        "samples": total,
+        "agreement": round(agree / total, 4),
+        "keras_accuracy": round(keras_correct / total, 4),
+        "tflite_accuracy": round(tflite_correct / total, 4),
+    }
+    print(f"   {name}: {json.dumps(result)}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quantization", choices=["float16", "int8", "dynamic"], default="float16")
+    parser.add_argument("--models", nargs="+", choices=list(classifier.MODEL_FILES), default=list(classifier.MODEL_FILES))
+    parser.add_argument("--calibration-dir", help="sample images for int8 calibration")
+    parser.add_argument("--parity-dir", help="held-out set for the Keras vs TFLite accuracy check")
+    parser.add_argument("--min-agreement", type=float, default=0.98)
+    args = parser.parse_args()
+
+    report = {}
+    for name in args.models:
+        keras_model, tflite_file = export(name, args.quantization, args.calibration_dir)
+        if args.parity_dir:
+            report[name] = check_parity(name, keras_model, tflite_file, args.parity_dir)
+
+    if report:
+        report_path = os.path.join(classifier.MODELS_DIR, f"parity_{args.quantization}.json")
+        with open(report_path, "w") as f:
+            json.dump(report, f, indent=2)
+        failed = [n for n, r in report.items() if r and r["agreement"] < args.min_agreement]
+        if failed:
+            print(f"❌ Parity below {args.min_agreement:.0%} for: {', '.join(failed)}")
+            sys.exit(1)
+        print(f"✅ Parity report written to {report_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import json
+import base64
+from datetime import datetime
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(position: dict) -> str:
+    """Opaque, URL-safe cursor for a keyset position; datetimes survive the round trip."""
+    def default(value):
+        if isinstance(value, datetime):
+            return {"$dt": value.isoformat()}
+        raise TypeError(f"Cannot encode {type(value).__name__} in cursor")
+    raw = json.dumps(position, default=default, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def cursor_after(doc: dict, field: str, id_field: str = "_id") -> str:
+    """Cursor positioned on `doc`; a missing `field` is encoded as null, which keyset_after pages past."""
+    return encode_cursor({field: doc.get(field), "id": doc[id_field]})
+
+
+def decode_cursor(cursor: str, keys: set) -> dict:
+    """Inverse of encode_cursor; InvalidCursor unless it decodes to a dict with exactly `keys`."""
+    def object_hook(obj):
+        if set(obj) == {"$dt"}:
+            return datetime.fromisoformat(obj["$dt"])
+        return obj
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        position = json.loads(raw, object_hook=object_hook)
+    except (ValueError, TypeError):
+        raise InvalidCursor(cursor)
+    if not isinstance(position, dict) or set(position) != set(keys):
+        raise InvalidCursor(cursor)
+    return position
+
+
+def keyset_after(field: str, value, last_id, direction: int, id_field: str = "_id") -> dict:
+    """Mongo filter for rows after (value, last_id) in (field, id_field) order.
+
+    Nulls go where Mongo sorts them: before every value ascending, after every
+    value descending, so a page ending on a missing value doesn't stall paging.
+    """
+    op = "$lt" if direction == -1 else "$gt"
+    clauses = [{field: value, id_field: {op: last_id}}]
+    if value is None:
+        if direction == 1:
+            clauses.append({field: {"$ne": None}})
+    else:
+        clauses.append({field: {op: value}})
+        if direction == -1:
+            clauses.append({field: None})
+    return {"$or": clauses}
@@ -0,0 +1,24 @@
+import json
+
+RECOMMENDATION_TEXT_FIELDS = ("cause", "treatment", "recommended_fertilizer", "recommended_medicine", "severity")
+
+
+def validate_recommendation(info) -> dict:
+    """The recommendation fields a report needs, or ValueError if any are missing or mistyped."""
+    if not isinstance(info, dict):
+        raise ValueError("Recommendation is not a JSON object")
+    for field in RECOMMENDATION_TEXT_FIELDS:
+        if not isinstance(info.get(field), str):
+            raise ValueError(f"Recommendation field '{field}' is missing or not a string")
+    symptoms = info.get("symptoms")
+    if not isinstance(symptoms, list) or not all(isinstance(s, str) for s in symptoms):
+        raise ValueError("Recommendation field 'symptoms' is not a list of strings")
+    return {**{field: info[field] for field in RECOMMENDATION_TEXT_FIELDS}, "symptoms": symptoms}
+
+
+def parse_recommendation(ai_text: str) -> dict:
+    if "```json" in ai_text:
+        ai_text = ai_text.split("```json")[1].split("```")[0]
+    elif "```" in ai_text:
+        ai_text = ai_text.split("```")[1].split("```")[0]
+    return validate_recommendation(json.loads(ai_text))
@@ -0,0 +1,92 @@
+"""Per-record cost of serializing a disease report list, old path vs new.
+
+old: parse ISO strings, build DiseaseReport models, validate them again
+     against response_model and encode with jsonable_encoder + json.dumps
+     (what FastAPI did for List[DiseaseReport]).
+new: dump the Mongo documents straight to bytes (documents_response).
+
+    python scripts/bench_serialization.py [records] [rounds]
+"""
+import os
+import sys
+import json
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "bench")
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+from server import DiseaseReport, documents_response, orjson  # noqa: E402
+
+
+def sample_docs(count):
+    now = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "user_id": f"user-{i % 50}",
+            "crop_name": "Corn",
+            "disease_name": "Common Rust",
+            "cause": "Fungal infection (Puccinia sorghi) spread by wind-borne spores.",
+            "symptoms": ["Reddish-brown pustules on both leaf surfaces", "Yellowing around lesions"],
+            "treatment": "Apply a foliar fungicide at first sign of pustules.",
+            "recommended_fertilizer": "Balanced NPK with adequate potassium",
+            "recommended_medicine": "Azoxystrobin or propiconazole",
+            "severity": "medium",
+            "details_pending": False,
+            "created_at": now - timedelta(minutes=i),
+        }
+        for i in range(count)
+    ]
+
+
+def old_path(docs):
+    adapter = TypeAdapter(List[DiseaseReport])
+    legacy = [{**d, "created_at": d["created_at"].replace(tzinfo=timezone.utc).isoformat()} for d in docs]
+
+    def run():
+        reports = [dict(r) for r in legacy]
+        for report in reports:
+            if isinstance(report.get("created_at"), str):
+                report["created_at"] = datetime.fromisoformat(report["created_at"])
+        models = [DiseaseReport(**r) for r in reports]
+        validated = adapter.validate_python(models)
+        content = jsonable_encoder(validated)
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+    return run
+
+
+def new_path(docs):
+    def run():
+        return documents_response(docs).body
+    return run
+
+
+def measure(fn, records, rounds):
+    fn()
+    started = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - started) / (rounds * records) * 1e6
+
+
+def main():
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    docs = sample_docs(records)
+
+    before = measure(old_path(docs), records, rounds)
+    after = measure(new_path(docs), records, rounds)
+    print(f"{records} records x {rounds} rounds (encoder: {'orjson' if orjson else 'json'})")
+    print(f"  old path: {before:8.2f} us/record")
+    print(f"  new path: {after:8.2f} us/record  ({before / after:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
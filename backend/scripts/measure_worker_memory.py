@@ -0,0 +1,70 @@
+"""Report memory per gunicorn process to compare INFERENCE_MODE=local vs sidecar.
+
+Run against a live deployment (Linux only):
+
+    python scripts/measure_worker_memory.py <gunicorn-master-pid>
+
+PSS (proportional set size) splits shared pages between the processes that
+map them, so its total is the real footprint of the whole process tree.
+"""
+import os
+import sys
+
+
+def read_memory(pid):
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("Rss", "Pss"):
+                values[key.lower()] = int(rest.split()[0]) // 1024
+    return values
+
+
+def read_cmdline(pid):
+    with open(f"/proc/{pid}/cmdline", "rb") as f:
+        return f.read().replace(b"\0", b" ").decode(errors="replace").strip()
+
+
+def children(pid):
+    result = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            result.append(int(entry))
+    return sorted(result)
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit(__doc__)
+    master = int(sys.argv[1])
+    rows = [("master", master)]
+    for pid in children(master):
+        role = "sidecar" if "inference_sidecar" in read_cmdline(pid) else "worker"
+        rows.append((role, pid))
+
+    print(f"{'role':<8} {'pid':>7} {'rss MB':>8} {'pss MB':>8}")
+    totals = {"rss": 0, "pss": 0}
+    worker_pss = []
+    for role, pid in rows:
+        mem = read_memory(pid)
+        totals["rss"] += mem["rss"]
+        totals["pss"] += mem["pss"]
+        if role == "worker":
+            worker_pss.append(mem["pss"])
+        print(f"{role:<8} {pid:>7} {mem['rss']:>8} {mem['pss']:>8}")
+
+    print(f"{'total':<8} {'':>7} {totals['rss']:>8} {totals['pss']:>8}")
+    if worker_pss:
+        print(f"workers: {len(worker_pss)}, avg pss per worker: {sum(worker_pss) // len(worker_pss)} MB")
+
+
+if __name__ == "__main__":
+    main()
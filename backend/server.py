@@ -1,13 +1,19 @@
 import os
+import time
+_import_started = time.perf_counter()
 os.environ["TF_ENABLE_ONEDNN_OPTS"] = "0"
 os.environ["TF_CPP_MIN_LOG_LEVEL"] = "2"
 
 import uvicorn
-from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Form
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Form, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse, Response
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import IndexModel, ReturnDocument, UpdateOne
+from pymongo.collation import Collation
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from bson import Binary
 from contextlib import asynccontextmanager
 import os
 import logging
@@ -15,16 +21,34 @@ from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
 from typing import List, Optional
 import uuid
-from datetime import datetime, timezone
+import asyncio
+from datetime import datetime, timezone, timedelta
 import base64
 import httpx
+import io
+import re
 import json
-from openai import AzureOpenAI
+import sys
+import hashlib
+import zipfile
 import firebase_admin
 from firebase_admin import credentials, firestore
-import tensorflow as tf
-import numpy as np
-from PIL import Image
+from inference import InferenceExecutor, InferenceSaturated, InferenceUnavailable, MicroBatcher, SidecarClient
+from cache import TTLCache, SingleFlight, PerceptualHashCache, StaleWhileRevalidateCache
+from upstream import CircuitOpen, build_upstreams
+from indexes import apply_indexes, check_query_shapes
+from blobstore import BlobNotFound, build_blob_store
+from recommendation import parse_recommendation, validate_recommendation
+from pagination import InvalidCursor, cursor_after, decode_cursor, encode_cursor, keyset_after
+from market import MARKET_DATE_FORMAT, MARKET_PRICE_FIELDS, market_row_changed, normalize_market_record
+from byte_ranges import RangeNotSatisfiable, parse_range
+from heatmap import cell_corner, heat_cell
+from body_limit import BodySizeLimit
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -59,78 +83,458 @@ db = client[db_name]
 
 
 # ========== ML MODELS LOAD ==========
-print("⏳ Loading ML models...")
+# INFERENCE_MODE=local   - this worker loads the classifiers itself (default).
+# INFERENCE_MODE=sidecar - one shared inference process (inference_sidecar.py,
+#                          started by gunicorn.conf.py) holds the models and every
+#                          worker reaches it over a Unix socket.
+INFERENCE_MODE = os.environ.get("INFERENCE_MODE", "local").lower()
+INFERENCE_SOCKET = os.environ.get("INFERENCE_SOCKET", "/tmp/farmerhelp-inference.sock")
+# Models are loaded once, eagerly, from the lifespan hook (see PRELOAD_MODELS);
+# /api/ready reports per-model status until they are warm.
+PRELOAD_MODELS = os.environ.get("PRELOAD_MODELS", "true").lower() == "true"
+
+# Image decoding (and local model calls) are blocking; run them on a dedicated
+# pool so the event loop keeps serving health, weather and news meanwhile.
+inference_executor = InferenceExecutor(
+    max_workers=int(os.environ.get("INFERENCE_WORKERS", 0)) or None,
+    max_queue=int(os.environ.get("INFERENCE_MAX_QUEUE", 0)) or None,
+    retry_after=int(os.environ.get("INFERENCE_RETRY_AFTER", 5)),
+)
 
-crop_model = None
-corn_model = None
-cotton_model = None
 
-def load_crop_model():
-    global crop_model
-    if crop_model is None:
-        model_path = os.path.join(BASE_DIR, "models", "crop_classifier_fixed.keras")
-        if not os.path.exists(model_path):
-            raise RuntimeError("crop_classifier.keras_fixed NOT FOUND")
-        crop_model = tf.keras.models.load_model(model_path, compile=False)
-    return crop_model
+# The ML stack (numpy, PIL, TensorFlow/TFLite) is imported lazily, off the event
+# loop, so the CRUD and proxy routes are serving before any of it is loaded.
+def load_classifier():
+    import classifier
+    return classifier
 
 
+# Set when the startup preload fails before any model is registered (e.g. the
+# ML stack can't be imported), so readiness reports "failed", not "pending".
+model_preload_error = None
 
-def load_corn_model():
-    global corn_model
-    if corn_model is None:
-        corn_model = tf.keras.models.load_model(
-            os.path.join(BASE_DIR, "models", "corn_disease_model.h5"),
-            compile=False
-        )
-    return corn_model
-
-def load_cotton_model():
-    global cotton_model
-    if cotton_model is None:
-        cotton_model = tf.keras.models.load_model(
-            os.path.join(BASE_DIR, "models", "cotton_disease_model.h5"),
-            compile=False
-        )
-    return cotton_model
-print("✅ ML models loaded")
+
+def preload_models():
+    global model_preload_error
+    try:
+        load_classifier().model_registry.load_all()
+    except Exception as e:
+        logging.exception("Model preload failed")
+        model_preload_error = f"{type(e).__name__}: {e}"
+
+
+def predict_batch(images):
+    return load_classifier().predict_batch(images)
+
+
+INFERENCE_LOCAL = INFERENCE_MODE != "sidecar"
+
+if INFERENCE_LOCAL:
+    # Concurrent uploads are coalesced into batched forward passes.
+    inference_service = MicroBatcher(
+        inference_executor,
+        predict_batch,
+        max_batch=int(os.environ.get("INFERENCE_MAX_BATCH", 16)),
+        max_wait_ms=float(os.environ.get("INFERENCE_MAX_WAIT_MS", 10)),
+    )
+else:
+    inference_service = SidecarClient(
+        INFERENCE_SOCKET,
+        retry_after=inference_executor.retry_after,
+        timeout=float(os.environ.get("INFERENCE_TIMEOUT", 30)),
+    )
 
 
-crop_classes = ['Corn', 'Cotton', 'Wheat']
-corn_diseases = ['Blight', 'Common_Rust', 'Gray_Leaf_Spot', 'Healthy']
-cotton_diseases = ['Bacterial_Blight', 'Curl_Virus', 'Fusarium_Wilt', 'Healthy']
+async def get_model_status() -> dict:
+    if INFERENCE_LOCAL:
+        # sys.modules holds "classifier" as soon as its import starts, before
+        # model_registry is defined; until then the models are still pending.
+        classifier = sys.modules.get("classifier")
+        registry = getattr(classifier, "model_registry", None)
+        if registry is None:
+            if model_preload_error is not None:
+                return {"ready": False, "state": "failed", "backend": None, "models": {}, "error": model_preload_error}
+            return {"ready": False, "state": "pending", "backend": None, "models": {}}
+        return {
+            "ready": registry.ready,
+            "state": registry.state,
+            "backend": classifier.INFERENCE_BACKEND,
+            "models": registry.status(),
+        }
+    try:
+        return await inference_service.status()
+    except InferenceUnavailable as e:
+        return {"ready": False, "state": "down", "models": {}, "error": str(e)}
+    except Exception as e:
+        return {"ready": False, "state": "unavailable", "models": {}, "error": str(e)}
 
 
-# Azure OpenAI client
+# Azure OpenAI client (async, with its own keep-alive connection pool)
 azure_client = None
+llm_http_client = None
+
+LLM_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", 15))
+# Overall budget for /detect-disease; past it the ML result is returned and
+# the recommendation is filled into the stored report in the background.
+DETECTION_DEADLINE_SECONDS = float(os.environ.get("DETECTION_DEADLINE_SECONDS", 6))
 
 if (
     os.environ.get("AZURE_API_KEY")
     and os.environ.get("AZURE_OPENAI_API_VERSION")
     and os.environ.get("AZURE_OPENAI_API_BASE")
 ):
-    azure_client = AzureOpenAI(
+    from openai import AsyncAzureOpenAI
+
+    llm_http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=int(os.environ.get("LLM_MAX_CONNECTIONS", 20)),
+            max_keepalive_connections=int(os.environ.get("LLM_MAX_KEEPALIVE", 10)),
+        ),
+        timeout=LLM_TIMEOUT,
+    )
+    azure_client = AsyncAzureOpenAI(
         api_key=os.environ.get("AZURE_API_KEY"),
         api_version=os.environ.get("AZURE_OPENAI_API_VERSION"),
         azure_endpoint=os.environ.get("AZURE_OPENAI_API_BASE"),
+        http_client=llm_http_client,
+        max_retries=1,
     )
 
-    
+# Strong references to fire-and-forget tasks so they aren't garbage collected mid-flight.
+background_tasks = set()
+
+
+def spawn_background(coro):
+    task = asyncio.ensure_future(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
 
 # # Create the main app
 # app = FastAPI()
 
+# Shared outbound HTTP clients, one pool per upstream, opened in lifespan.
+UPSTREAM_TIMEOUTS = {
+    "weather": float(os.environ.get("WEATHER_TIMEOUT", 5)),
+    "news": float(os.environ.get("NEWS_TIMEOUT", 5)),
+    "market": float(os.environ.get("MARKET_TIMEOUT", 10)),
+}
+UPSTREAM_LIMITS = httpx.Limits(
+    max_connections=int(os.environ.get("UPSTREAM_MAX_CONNECTIONS", 50)),
+    max_keepalive_connections=int(os.environ.get("UPSTREAM_MAX_KEEPALIVE", 20)),
+    keepalive_expiry=float(os.environ.get("UPSTREAM_KEEPALIVE_EXPIRY", 30)),
+)
+upstreams = {}
+
+
+async def claim_scheduled_run(name: str, interval: float) -> bool:
+    """Atomically claim the next run of a periodic task across all workers."""
+    now = datetime.now(timezone.utc)
+    try:
+        await db.scheduled_tasks.update_one(
+            {"_id": name, "next_run": {"$lte": now}},
+            {"$set": {"next_run": now + timedelta(seconds=interval), "last_run": now}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # The task exists and its next run is still in the future.
+        return False
+    return True
+
+
+# off: just create indexes; warn: also explain() the hot queries and log unindexed
+# ones; strict: same, but block startup and fail it if anything is missing.
+INDEX_CHECK = os.environ.get("MONGO_INDEX_CHECK", "off").lower()
+
+# Case-insensitive matching on commodity/state/market, backed by indexes with the same collation.
+MARKET_COLLATION = Collation(locale="en", strength=2)
+
+# Hot query shapes checked with explain(); keep in step with the routes below.
+QUERY_SHAPES = [
+    ("user by firebase_uid", "users", {"firebase_uid": ""}, None),
+    ("users listing", "users", {}, [("created_at", -1), ("id", -1)]),
+    ("user disease reports", "disease_reports", {"user_id": ""}, [("created_at", -1), ("id", -1)]),
+    ("disease reports listing", "disease_reports", {}, [("created_at", -1), ("id", -1)]),
+    ("disease report by id", "disease_reports", {"id": ""}, None),
+    ("user crop calendar", "crop_calendar", {"user_id": ""}, [("created_at", -1), ("id", -1)]),
+    ("crop calendar entry by id", "crop_calendar", {"id": ""}, None),
+    ("contact messages listing", "contact_messages", {}, [("created_at", -1), ("id", -1)]),
+    ("heatmap cells", "disease_heat_cells", {"day": {"$gte": datetime(2000, 1, 1)}, "row": {"$gte": 0}}, None),
+    ("latest market prices", "market_prices", {}, [("arrival_date", -1), ("_id", -1)], MARKET_COLLATION),
+    ("commodity market prices", "market_prices", {"commodity": ""},
+     [("arrival_date", -1), ("_id", -1)], MARKET_COLLATION),
+    ("commodity prices in a market", "market_prices", {"commodity": "", "state": "", "market": ""},
+     [("arrival_date", -1), ("_id", -1)], MARKET_COLLATION),
+    ("state market prices", "market_prices", {"state": ""}, [("arrival_date", -1), ("_id", -1)], MARKET_COLLATION),
+    ("market prices by market", "market_prices", {"market": ""}, [("arrival_date", -1), ("_id", -1)], MARKET_COLLATION),
+    ("market prices by modal price", "market_prices", {}, [("modal_price", 1), ("_id", 1)], MARKET_COLLATION),
+    ("commodity prices by modal price", "market_prices", {"commodity": ""},
+     [("modal_price", 1), ("_id", 1)], MARKET_COLLATION),
+    ("market price trends", "market_price_daily", {"commodity": "", "date": {"$gte": datetime(2000, 1, 1)}},
+     [("state", 1), ("market", 1), ("date", 1)], MARKET_COLLATION),
+]
+
+
+def required_indexes() -> dict:
+    newest_first = [("created_at", -1), ("id", -1)]
+    return {
+        "users": [
+            IndexModel("firebase_uid", unique=True),
+            IndexModel(newest_first),
+        ],
+        "disease_reports": [
+            IndexModel("id", unique=True),
+            IndexModel([("location", "2dsphere")]),
+            IndexModel([("user_id", 1)] + newest_first),
+            IndexModel(newest_first),
+        ],
+        "crop_calendar": [
+            IndexModel("id", unique=True),
+            IndexModel([("user_id", 1)] + newest_first),
+        ],
+        "contact_messages": [
+            IndexModel(newest_first),
+        ],
+        "disease_heat_cells": [
+            IndexModel([("day", 1), ("row", 1), ("col", 1)]),
+        ],
+        "recommendation_cache": [
+            IndexModel("expires_at", expireAfterSeconds=0),
+        ],
+        "detection_jobs": [
+            IndexModel([("status", 1), ("run_at", 1)]),
+            IndexModel("lease_until"),
+        ],
+        "news_articles": [
+            IndexModel("url", unique=True),
+            IndexModel([("publishedAt", -1)]),
+        ],
+        "market_prices": [
+            IndexModel(keys, collation=MARKET_COLLATION) for keys in (
+                [("commodity", 1), ("state", 1), ("market", 1), ("arrival_date", -1), ("_id", -1)],
+                [("commodity", 1), ("arrival_date", -1), ("_id", -1)],
+                [("state", 1), ("arrival_date", -1), ("_id", -1)],
+                [("market", 1), ("arrival_date", -1), ("_id", -1)],
+                [("arrival_date", -1), ("_id", -1)],
+                [("commodity", 1), ("modal_price", 1), ("_id", 1)],
+                [("modal_price", 1), ("_id", 1)],
+            )
+        ],
+        "market_price_daily": [
+            IndexModel([("commodity", 1), ("state", 1), ("market", 1), ("date", 1)], collation=MARKET_COLLATION),
+            IndexModel("date"),
+        ],
+    }
+
+
+async def ensure_indexes():
+    try:
+        failed = await apply_indexes(db, required_indexes())
+        unindexed = await check_query_shapes(db, QUERY_SHAPES) if INDEX_CHECK != "off" else []
+    except Exception as e:
+        if INDEX_CHECK == "strict":
+            raise
+        logger.warning(f"Could not create indexes: {e}")
+        return
+    if INDEX_CHECK == "strict" and (failed or unindexed):
+        raise RuntimeError(
+            f"Index check failed: collections {failed}, query shapes {[q['name'] for q in unindexed]}"
+        )
+
+
+# Timestamps that older releases stored as ISO-8601 strings.
+ISO_DATE_FIELDS = {
+    "users": ("created_at", "updated_at"),
+    "disease_reports": ("created_at",),
+    "crop_calendar": ("created_at",),
+    "contact_messages": ("created_at",),
+}
+DATE_MIGRATION_BATCH = 500
+
+
+async def migrate_iso_dates():
+    """One-time conversion of legacy string timestamps to BSON dates.
+
+    Streams only the documents that still hold strings and rewrites them in
+    bulk batches, so reruns and concurrent workers are harmless. Completion is
+    recorded in `migrations` so later boots skip the scan.
+    """
+    try:
+        if await db.migrations.find_one({"_id": "iso_dates"}):
+            return
+        converted = 0
+        for collection, fields in ISO_DATE_FIELDS.items():
+            query = {"$or": [{field: {"$type": "string"}} for field in fields]}
+            operations = []
+            async for doc in db[collection].find(query, {field: 1 for field in fields}):
+                update = {}
+                for field in fields:
+                    if isinstance(doc.get(field), str):
+                        try:
+                            update[field] = datetime.fromisoformat(doc[field])
+                        except ValueError:
+                            logger.warning(f"Unparseable {collection}.{field} on {doc['_id']}: {doc[field]!r}")
+                if update:
+                    operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": update}))
+                if len(operations) >= DATE_MIGRATION_BATCH:
+                    await db[collection].bulk_write(operations, ordered=False)
+                    converted += len(operations)
+                    operations = []
+            if operations:
+                await db[collection].bulk_write(operations, ordered=False)
+                converted += len(operations)
+        await db.migrations.update_one(
+            {"_id": "iso_dates"},
+            {"$set": {"completed_at": datetime.now(timezone.utc), "converted": converted}},
+            upsert=True
+        )
+        logger.info(f"Converted {converted} documents to native dates")
+    except Exception as e:
+        logger.warning(f"Date migration did not finish: {e}")
+
+
+async def migrate_inline_images():
+    """Move images stored inline as image_base64 on old reports into the blob store.
+
+    Each image waits out inference saturation like a batch upload. Completion is
+    only recorded in `migrations` once every decodable image has moved, since
+    reports no longer expose image_base64; otherwise the next boot tries again.
+    """
+    moved = failed = undecodable = 0
+    try:
+        if await db.migrations.find_one({"_id": "inline_images"}):
+            return
+        async for report in db.disease_reports.find({"image_base64": {"$type": "string"}}, {"image_base64": 1}):
+            try:
+                data = base64.b64decode(report["image_base64"].split(",", 1)[-1])
+            except ValueError:
+                logger.warning(f"Undecodable image_base64 on report {report['_id']}")
+                undecodable += 1
+                continue
+            deadline = asyncio.get_running_loop().time() + BATCH_SATURATION_WAIT
+            images = await store_report_images(io.BytesIO(data), deadline)
+            if not images:
+                failed += 1
+                continue
+            await db.disease_reports.update_one(
+                {"_id": report["_id"]},
+                {"$set": images, "$unset": {"image_base64": ""}}
+            )
+            moved += 1
+        if failed:
+            logger.warning(f"Moved {moved} inline report images; {failed} failed and will be retried next start")
+            return
+        await db.migrations.update_one(
+            {"_id": "inline_images"},
+            {"$set": {"completed_at": datetime.now(timezone.utc), "moved": moved, "undecodable": undecodable}},
+            upsert=True
+        )
+        logger.info(f"Moved {moved} inline report images to the blob store ({undecodable} undecodable)")
+    except Exception as e:
+        logger.warning(f"Inline image migration did not finish: {e}")
+
+
+async def backfill_report_locations():
+    """One-time pass that stamps older reports with their farm point and counts them into the heatmap."""
+    try:
+        if await db.migrations.find_one({"_id": "report_locations"}):
+            return
+        stamped = 0
+        missing = {"location": {"$exists": False}}
+        for user_id in await db.disease_reports.distinct("user_id", missing):
+            location = await report_location(user_id)
+            if not location:
+                continue
+            docs = []
+            projection = {"crop_name": 1, "disease_name": 1, "created_at": 1}
+            async for report in db.disease_reports.find({"user_id": user_id, **missing}, projection):
+                result = await db.disease_reports.update_one({"_id": report["_id"], **missing}, {"$set": location})
+                # Only count reports this pass stamped, so nothing is counted twice.
+                if result.modified_count and isinstance(report.get("created_at"), datetime):
+                    docs.append({**report, **location})
+                if len(docs) >= DATE_MIGRATION_BATCH:
+                    await record_heat(docs)
+                    stamped += len(docs)
+                    docs = []
+            await record_heat(docs)
+            stamped += len(docs)
+        await db.migrations.update_one(
+            {"_id": "report_locations"},
+            {"$set": {"completed_at": datetime.now(timezone.utc), "stamped": stamped}},
+            upsert=True
+        )
+        logger.info(f"Stamped {stamped} older reports with farm locations")
+    except Exception as e:
+        logger.warning(f"Report location backfill did not finish: {e}")
+
+
+async def run_migrations():
+    # In order: the location backfill needs created_at as a date to bin by day.
+    await migrate_iso_dates()
+    await migrate_inline_images()
+    await backfill_report_locations()
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup (optional)
+    # Startup
+    upstreams.update(build_upstreams(
+        UPSTREAM_TIMEOUTS,
+        UPSTREAM_LIMITS,
+        failure_threshold=int(os.environ.get("UPSTREAM_FAILURE_THRESHOLD", 5)),
+        reset_timeout=float(os.environ.get("UPSTREAM_RESET_TIMEOUT", 30)),
+    ))
+    if INFERENCE_LOCAL:
+        inference_service.start()
+        if PRELOAD_MODELS:
+            # Import, load and warm the models off the event loop; /api/ready flips once done.
+            spawn_background(asyncio.to_thread(preload_models))
+    if INDEX_CHECK == "strict":
+        await ensure_indexes()
+    else:
+        spawn_background(ensure_indexes())
+    spawn_background(run_migrations())
+    if JOB_WORKERS > 0:
+        start_job_workers()
+    weather_prefetcher = spawn_background(prefetch_weather())
+    news_task = spawn_background(news_refresher())
+    market_task = spawn_background(market_price_syncer())
+    global farm_location_watch
+    if FARM_LOCATION_LISTENER and firebase_db is not None:
+        try:
+            farm_location_watch = start_farm_location_listener(asyncio.get_running_loop())
+        except Exception as e:
+            logger.warning(f"Farm location listener not started: {e}")
+    logger.info(f"API ready in {time.perf_counter() - _import_started:.2f}s (inference mode: {INFERENCE_MODE})")
     yield
     # Shutdown
+    weather_prefetcher.cancel()
+    news_task.cancel()
+    market_task.cancel()
+    if farm_location_watch is not None:
+        farm_location_watch.unsubscribe()
+    await stop_job_workers()
+    if INFERENCE_LOCAL:
+        await inference_service.stop()
+    else:
+        await inference_service.close()
+    inference_executor.shutdown()
+    if llm_http_client is not None:
+        await llm_http_client.aclose()
+    for upstream in upstreams.values():
+        await upstream.aclose()
     client.close()
     logger.info("MongoDB connection closed")
 
 
 app = FastAPI(lifespan=lifespan)
 
+# Per-path request body caps for the upload routes, filled in next to their
+# size limits below. Added before CORS so a 413 still carries CORS headers.
+upload_body_limits = {}
+app.add_middleware(BodySizeLimit, limits=upload_body_limits)
+
 # ✅ CORS MUST COME HERE
 app.add_middleware(
     CORSMiddleware,
@@ -141,6 +545,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 
@@ -186,7 +591,8 @@ class DiseaseReport(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     user_id: str
-    image_base64: Optional[str] = None
+    image_id: Optional[str] = None
+    thumbnail_id: Optional[str] = None
     crop_name: str
     disease_name: str
     cause: str
@@ -195,6 +601,7 @@ class DiseaseReport(BaseModel):
     recommended_fertilizer: str
     recommended_medicine: str
     severity: str
+    details_pending: bool = False
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class CropCalendarEntry(BaseModel):
@@ -232,19 +639,83 @@ class ContactMessageCreate(BaseModel):
 
 
 
-def get_farm_location_from_firebase(firebase_uid: str):
-    doc = firebase_db.collection("users").document(firebase_uid).get()
+# ========== FARM LOCATIONS ==========
+# Farm coordinates live in Firestore (users/{uid}.farmLocation). They are
+# resolved off the event loop, cached in-process, and mirrored onto the Mongo
+# users document as a fallback for when Firestore is unavailable. With
+# FARM_LOCATION_LISTENER=true a Firestore on_snapshot listener keeps the cache
+# current; otherwise entries expire after FARM_LOCATION_TTL.
+
+FARM_LOCATION_TTL = int(os.environ.get("FARM_LOCATION_TTL", 600))
+FARM_LOCATION_LISTENER = os.environ.get("FARM_LOCATION_LISTENER", "false").lower() == "true"
 
+farm_location_cache = TTLCache(ttl=FARM_LOCATION_TTL, max_size=int(os.environ.get("FARM_LOCATION_CACHE_SIZE", 10000)))
+farm_location_flight = SingleFlight()
+farm_location_watch = None
+
+
+def read_firestore_location(firebase_uid: str):
+    doc = firebase_db.collection("users").document(firebase_uid).get()
     if not doc.exists:
+        return False, None
+    return True, (doc.to_dict() or {}).get("farmLocation")
+
+
+async def mirror_farm_location(firebase_uid: str, lat: float, lng: float):
+    try:
+        await db.users.update_one(
+            {"firebase_uid": firebase_uid, "farm_location": {"$ne": {"lat": lat, "lng": lng}}},
+            {"$set": {"farm_location": {"lat": lat, "lng": lng}}}
+        )
+    except Exception as e:
+        logging.warning(f"Could not mirror farm location for {firebase_uid}: {e}")
+
+
+async def load_farm_location(firebase_uid: str):
+    found = None
+    if firebase_db is not None:
+        try:
+            found, location = await asyncio.to_thread(read_firestore_location, firebase_uid)
+        except Exception as e:
+            logging.warning(f"Firestore location lookup failed for {firebase_uid}: {e}")
+            found = None
+        else:
+            if location:
+                coords = (location["lat"], location["lng"])
+                farm_location_cache.set(firebase_uid, coords)
+                spawn_background(mirror_farm_location(firebase_uid, *coords))
+                return coords
+
+    user = await db.users.find_one({"firebase_uid": firebase_uid}, {"_id": 0, "farm_location": 1})
+    if user and user.get("farm_location"):
+        coords = (user["farm_location"]["lat"], user["farm_location"]["lng"])
+        farm_location_cache.set(firebase_uid, coords)
+        return coords
+
+    if found is False:
         raise HTTPException(status_code=404, detail="User not found in Firebase")
+    raise HTTPException(status_code=400, detail="Farm location not set")
 
-    data = doc.to_dict()
-    location = data.get("farmLocation")
 
-    if not location:
-        raise HTTPException(status_code=400, detail="Farm location not set")
+async def get_farm_location(firebase_uid: str):
+    coords = farm_location_cache.get(firebase_uid)
+    if coords is not None:
+        return coords
+    return await farm_location_flight.do(firebase_uid, lambda: load_farm_location(firebase_uid))
 
-    return location["lat"], location["lng"]
+
+def start_farm_location_listener(loop):
+    def on_users_snapshot(snapshots, changes, read_time):
+        # Runs on a Firestore background thread; hand updates to the event loop.
+        for change in changes:
+            uid = change.document.id
+            location = None if change.type.name == "REMOVED" else (change.document.to_dict() or {}).get("farmLocation")
+            if location:
+                loop.call_soon_threadsafe(farm_location_cache.set, uid, (location["lat"], location["lng"]))
+            else:
+                loop.call_soon_threadsafe(farm_location_cache.pop, uid)
+
+    return firebase_db.collection("users").on_snapshot(on_users_snapshot)
 
 # DISEASE_INFO = {
 #     "Corn_Blight": {
@@ -273,6 +744,196 @@ def get_farm_location_from_firebase(firebase_uid: str):
 #     }
 # }
 
+# ========== AI RECOMMENDATIONS ==========
+
+# Bump when the prompt changes so cached answers from the old prompt are ignored.
+RECOMMENDATION_PROMPT_VERSION = "v1"
+RECOMMENDATION_CACHE_TTL = int(os.environ.get("RECOMMENDATION_CACHE_TTL", 7 * 24 * 3600))
+
+RECOMMENDATION_SYSTEM_PROMPT = """
+You are an expert agricultural scientist.
+Given a crop name and disease name, return ONLY valid JSON:
+
+{
+  "cause": "",
+  "symptoms": [],
+  "treatment": "",
+  "recommended_fertilizer": "",
+  "recommended_medicine": "",
+  "severity": "Low/Medium/High/Critical"
+}
+"""
+
+AI_NOT_CONFIGURED_INFO = {
+    "cause": "AI service not configured",
+    "symptoms": [],
+    "treatment": "N/A",
+    "recommended_fertilizer": "N/A",
+    "recommended_medicine": "N/A",
+    "severity": "Unknown"
+}
+
+AI_PENDING_INFO = {
+    "cause": "Recommendation is being prepared",
+    "symptoms": [],
+    "treatment": "Pending",
+    "recommended_fertilizer": "Pending",
+    "recommended_medicine": "Pending",
+    "severity": "Pending"
+}
+
+AI_FAILED_INFO = {
+    "cause": "Unknown",
+    "symptoms": [],
+    "treatment": "N/A",
+    "recommended_fertilizer": "N/A",
+    "recommended_medicine": "N/A",
+    "severity": "Unknown"
+}
+
+recommendation_cache = TTLCache(ttl=RECOMMENDATION_CACHE_TTL, max_size=256)
+recommendation_flight = SingleFlight()
+
+
+async def request_recommendation(crop_name: str, disease_name: str) -> dict:
+    response = await azure_client.chat.completions.create(
+        model=os.environ.get("AZURE_OPENAI_API_NAME", "gpt-4o"),
+        messages=[
+            {"role": "system", "content": RECOMMENDATION_SYSTEM_PROMPT},
+            {"role": "user", "content": f"Crop: {crop_name}\nDisease: {disease_name}"}
+        ],
+        max_tokens=500,
+        timeout=LLM_TIMEOUT
+    )
+    return parse_recommendation(response.choices[0].message.content)
+
+
+async def load_recommendation(key: str, crop_name: str, disease_name: str) -> dict:
+    now = datetime.now(timezone.utc)
+    try:
+        cached = await db.recommendation_cache.find_one({"_id": key, "expires_at": {"$gt": now}})
+    except Exception as e:
+        logging.warning(f"Recommendation cache read failed: {e}")
+        cached = None
+    if cached:
+        try:
+            info = validate_recommendation(cached.get("info"))
+        except ValueError as e:
+            logging.warning(f"Ignoring invalid cached recommendation {key}: {e}")
+        else:
+            remaining = (cached["expires_at"].replace(tzinfo=timezone.utc) - now).total_seconds()
+            recommendation_cache.set(key, info, ttl=remaining)
+            return info
+
+    try:
+        info = await request_recommendation(crop_name, disease_name)
+    except Exception as e:
+        logging.warning(f"Azure OpenAI failed: {e}")
+        return AI_FAILED_INFO
+
+    # Only valid answers are cached, so a failed or malformed one is retried next time.
+    recommendation_cache.set(key, info)
+    try:
+        await db.recommendation_cache.replace_one(
+            {"_id": key},
+            {
+                "crop_name": crop_name,
+                "disease_name": disease_name,
+                "prompt_version": RECOMMENDATION_PROMPT_VERSION,
+                "info": info,
+                "expires_at": now + timedelta(seconds=RECOMMENDATION_CACHE_TTL),
+            },
+            upsert=True
+        )
+    except Exception as e:
+        logging.warning(f"Recommendation cache write failed: {e}")
+    return info
+
+
+def recommendation_key(crop_name: str, disease_name: str) -> str:
+    return f"{RECOMMENDATION_PROMPT_VERSION}:{crop_name}:{disease_name}"
+
+
+def recommendation_at_hand(crop_name: str, disease_name: str) -> Optional[dict]:
+    """Details that need no await (not configured, or in the memory cache), else None."""
+    if not azure_client:
+        return AI_NOT_CONFIGURED_INFO
+    return recommendation_cache.get(recommendation_key(crop_name, disease_name))
+
+
+async def get_recommendation(crop_name: str, disease_name: str) -> dict:
+    info = recommendation_at_hand(crop_name, disease_name)
+    if info is not None:
+        return info
+    key = recommendation_key(crop_name, disease_name)
+    return await recommendation_flight.do(
+        key, lambda: load_recommendation(key, crop_name, disease_name)
+    )
+
+
+async def complete_pending_report(report_id: str, recommendation_task):
+    try:
+        info = await recommendation_task
+    except Exception as e:
+        logging.warning(f"Background recommendation failed for report {report_id}: {e}")
+        info = AI_FAILED_INFO
+    await db.disease_reports.update_one(
+        {"id": report_id},
+        {"$set": {**info, "details_pending": False}}
+    )
+
+# ========== PAGINATION ==========
+
+def read_cursor(cursor: str, keys: set) -> dict:
+    try:
+        return decode_cursor(cursor, keys)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+# List endpoints return newest first, keyed on (created_at, id). Bodies stay plain
+# arrays; the cursor for the next page travels in the X-Next-Cursor header.
+PAGE_SORT = [("created_at", -1), ("id", -1)]
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def model_projection(model) -> dict:
+    """Mongo projection for exactly the fields a response model exposes."""
+    return {"_id": 0, **{name: 1 for name in model.model_fields}}
+
+
+async def fetch_page(collection, query: dict, projection: dict, limit: int, cursor: Optional[str]):
+    """Returns (docs, next cursor or None)."""
+    if cursor:
+        position = read_cursor(cursor, {"created_at", "id"})
+        query = {"$and": [query, keyset_after("created_at", position["created_at"], position["id"], -1, "id")]}
+    docs = await collection.find(query, projection).sort(PAGE_SORT).limit(limit).to_list(limit)
+    next_cursor = None
+    if len(docs) == limit:
+        next_cursor = cursor_after(docs[-1], "created_at", "id")
+    return docs, next_cursor
+
+
+def json_default(value):
+    if isinstance(value, datetime):
+        # Mongo hands back naive datetimes that are UTC.
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def dump_json(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=json_default, option=orjson.OPT_NAIVE_UTC)
+    return json.dumps(content, default=json_default, separators=(",", ":")).encode()
+
+
+def documents_response(content, next_cursor: Optional[str] = None) -> Response:
+    """Serialize Mongo documents as-is; they were validated when written."""
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return Response(dump_json(content), media_type="application/json", headers=headers)
+
 # ========== ROUTES ==========
 
 @api_router.get("/")
@@ -291,10 +952,42 @@ async def health_check():
         "status": "healthy",
         "database": db_status,
         # "azure_openai": "configured" if os.environ.get('AZURE_API_KEY') else "not configured",
-        "ml_models": "loaded",
+        "ml_models": (await get_model_status())["state"],
+        "inference_queue_depth": inference_executor.queue_depth,
         "timestamp": datetime.now(timezone.utc).isoformat()
     }
 
+@api_router.get("/ready")
+async def readiness_check():
+    status = await get_model_status()
+    body = {
+        "ready": status["ready"],
+        "state": status.get("state"),
+        "inference_mode": INFERENCE_MODE,
+        "inference_backend": status.get("backend"),
+        "models": status["models"],
+    }
+    if "error" in status:
+        body["error"] = status["error"]
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=body)
+
+@api_router.get("/metrics")
+async def get_metrics():
+    metrics = {
+        "inference": inference_executor.stats(),
+        "recommendation_cache": recommendation_cache.stats(),
+        "result_cache": result_cache.stats(),
+        "weather_cache": weather_cache.stats(),
+        "farm_location_cache": farm_location_cache.stats(),
+        "upstreams": {name: upstream.stats() for name, upstream in upstreams.items()},
+    }
+    if INFERENCE_LOCAL:
+        metrics["batching"] = inference_service.stats()
+    else:
+        sidecar = await get_model_status()
+        metrics["sidecar"] = {k: sidecar.get(k) for k in ("pid", "inference", "batching")}
+    return metrics
+
 # ========== USER MANAGEMENT ==========
 
 @api_router.post("/users", response_model=UserProfile)
@@ -305,26 +998,25 @@ async def create_or_update_user(user: UserProfileCreate):
     
     user_obj = UserProfile(**user.model_dump())
     doc = user_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
-    doc['updated_at'] = doc['updated_at'].isoformat()
-    await db.users.insert_one(doc)
+    try:
+        await db.users.insert_one(doc)
+    except DuplicateKeyError:
+        # Lost a race with a concurrent sign-up; the unique index kept one copy.
+        existing = await db.users.find_one({"firebase_uid": user.firebase_uid}, {"_id": 0})
+        return UserProfile(**existing)
     return user_obj
 
 @api_router.get("/users/{firebase_uid}", response_model=UserProfile)
 async def get_user(firebase_uid: str):
-    user = await db.users.find_one({"firebase_uid": firebase_uid}, {"_id": 0})
+    user = await db.users.find_one({"firebase_uid": firebase_uid}, model_projection(UserProfile))
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    if isinstance(user.get('created_at'), str):
-        user['created_at'] = datetime.fromisoformat(user['created_at'])
-    if isinstance(user.get('updated_at'), str):
-        user['updated_at'] = datetime.fromisoformat(user['updated_at'])
-    return UserProfile(**user)
+    return documents_response(user)
 
 @api_router.put("/users/{firebase_uid}", response_model=UserProfile)
 async def update_user(firebase_uid: str, update: UserProfileUpdate):
     update_data = {k: v for k, v in update.model_dump().items() if v is not None}
-    update_data['updated_at'] = datetime.now(timezone.utc).isoformat()
+    update_data['updated_at'] = datetime.now(timezone.utc)
     
     result = await db.users.update_one(
         {"firebase_uid": firebase_uid},
@@ -336,14 +1028,12 @@ async def update_user(firebase_uid: str, update: UserProfileUpdate):
     return await get_user(firebase_uid)
 
 @api_router.get("/users", response_model=List[UserProfile])
-async def get_all_users():
-    users = await db.users.find({}, {"_id": 0}).to_list(1000)
-    for user in users:
-        if isinstance(user.get('created_at'), str):
-            user['created_at'] = datetime.fromisoformat(user['created_at'])
-        if isinstance(user.get('updated_at'), str):
-            user['updated_at'] = datetime.fromisoformat(user['updated_at'])
-    return [UserProfile(**u) for u in users]
+async def get_all_users(
+    limit: int = Query(1000, ge=1, le=1000),
+    cursor: Optional[str] = None
+):
+    users, next_cursor = await fetch_page(db.users, {}, model_projection(UserProfile), limit, cursor)
+    return documents_response(users, next_cursor)
 
 @api_router.delete("/users/{firebase_uid}")
 async def delete_user(firebase_uid: str):
@@ -354,153 +1044,220 @@ async def delete_user(firebase_uid: str):
 
 # ========== DISEASE DETECTION ==========
 
-@api_router.post("/detect-disease")
-async def detect_disease(
-    user_id: str = Form(...),
-    image: UploadFile = File(...)
-):
-    contents = await image.read()
-    if len(contents) > 5 * 1024 * 1024:
-        raise HTTPException(status_code=400, detail="Image too large (max 5MB)")
-    image.file.seek(0)
-    
-    try:
-        # ---------- IMAGE PREPROCESS ----------
-        img = Image.open(image.file).convert("RGB")
-        img = img.resize((224, 224))
-        img_array = np.array(img) / 255.0
-        img_array = np.expand_dims(img_array, axis=0)
-
-        # ---------- STEP 1: CROP PREDICTION (ML) ----------
-        crop_pred = load_crop_model().predict(img_array)
-        crop_index = int(np.argmax(crop_pred))
-        crop_name = crop_classes[crop_index]
-        crop_confidence = float(np.max(crop_pred)) * 100
-
-        # ---------- STEP 2: DISEASE PREDICTION (ML) ----------
-        if crop_name == "Corn":
-           dis_pred = load_corn_model().predict(img_array)
-           disease_name = corn_diseases[np.argmax(dis_pred)]
-        elif crop_name == "Cotton":
-            dis_pred = load_cotton_model().predict(img_array)
-            disease_name = cotton_diseases[np.argmax(dis_pred)]
-        else:
-            disease_name = "Healthy"
-            dis_pred = [[1.0]]
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", 5 * 1024 * 1024))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+# Room for the multipart boundaries, part headers and the other form fields.
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+IMAGE_TOO_LARGE = f"Image too large (max {MAX_UPLOAD_BYTES // (1024 * 1024)}MB)"
+
+# Oversized requests are cut off while they stream in, before Starlette has
+# spooled the whole multipart body (see BodySizeLimit).
+for _path in ("/api/detect-disease", "/api/detect-disease/jobs"):
+    upload_body_limits[_path] = (MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES, IMAGE_TOO_LARGE)
+
+
+async def check_upload_size(upload: UploadFile):
+    # The body cap above bounds the request; this checks the image part itself
+    # once spooled, counting it in small chunks instead of reading it into memory.
+    size = upload.size
+    if size is None:
+        size = 0
+        while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if size > MAX_UPLOAD_BYTES:
+                break
+    if size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=400, detail=IMAGE_TOO_LARGE)
+    await upload.seek(0)
+
+RESULT_CACHE_SIZE = int(os.environ.get("RESULT_CACHE_SIZE", 2048))
+# Max differing bits (of 64) for two uploads to count as the same leaf photo.
+RESULT_CACHE_MAX_DISTANCE = int(os.environ.get("RESULT_CACHE_MAX_DISTANCE", 4))
+
+# ML results for recently seen photos, keyed by exact upload hash with a
+# perceptual-hash fallback for re-uploads and near-identical burst shots.
+result_cache = PerceptualHashCache(max_size=RESULT_CACHE_SIZE, max_distance=RESULT_CACHE_MAX_DISTANCE)
+
+
+def hash_upload(fileobj):
+    from imaging import file_digest
+    return file_digest(fileobj, UPLOAD_CHUNK_SIZE)
+
+
+def decode_upload(fileobj):
+    # A saturated classify_upload is retried on the same file, so both steps
+    # start from the top and leave it there.
+    from imaging import preprocess_image, perceptual_hash
+    fileobj.seek(0)
+    image = preprocess_image(fileobj)
+    fileobj.seek(0)
+    return image, perceptual_hash(image)
+
+
+async def classify_upload(fileobj) -> dict:
+    digest = await inference_executor.run(hash_upload, fileobj)
+    cached = result_cache.get_exact(digest)
+    if cached is not None:
+        return cached
+
+    image, phash = await inference_executor.run(decode_upload, fileobj)
+    cached = result_cache.get_similar(phash)
+    if cached is not None:
+        result_cache.set(digest, phash, cached)
+        return cached
+
+    crop_name, crop_confidence, disease_name, disease_confidence = await inference_service.submit(image)
+    result = {
+        "crop": crop_name,
+        "crop_confidence": round(crop_confidence, 2),
+        "disease": disease_name,
+        "disease_confidence": round(disease_confidence, 2),
+    }
+    result_cache.set(digest, phash, result)
+    return result
+
+
+async def run_when_free(fn, deadline: Optional[float]):
+    """Await fn(), backing off while inference is saturated until `deadline` (loop time)."""
+    loop = asyncio.get_running_loop()
+    delay = 0.05
+    while True:
+        try:
+            return await fn()
+        except InferenceSaturated:
+            if deadline is None or loop.time() + delay > deadline:
+                raise
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 1.0)
+
+
+async def recommendation_before(result: dict, deadline: Optional[float]):
+    """Details for a classified image, or the pending placeholder if `deadline` passes first.
+
+    `result` may be a shared result_cache entry, so it is never modified. Details
+    for a repeat photo come from the recommendation cache, which expires them
+    and keys them by prompt version.
+
+    Details already at hand are returned even if `deadline` has passed, so a
+    slow classification doesn't turn a cache hit into a pending report.
+    """
+    info = recommendation_at_hand(result["crop"], result["disease"])
+    if info is not None:
+        return info, False, None
+    task = asyncio.ensure_future(get_recommendation(result["crop"], result["disease"]))
+    if deadline is None:
+        info = await task
+    else:
+        remaining = deadline - asyncio.get_running_loop().time()
+        try:
+            info = await asyncio.wait_for(asyncio.shield(task), timeout=max(remaining, 0))
+        except asyncio.TimeoutError:
+            return AI_PENDING_INFO, True, task
+    return info, False, task
+
+
+# Uploads and their thumbnails live in a content-addressed blob store (a Mongo
+# collection by default, BLOB_STORE=local for a directory); reports only keep the digests.
+blob_store = build_blob_store(
+    db,
+    os.environ.get("BLOB_STORE", "mongo"),
+    os.environ.get("BLOB_STORE_PATH", str(ROOT_DIR / "blobs")),
+)
 
-        disease_confidence = float(np.max(dis_pred)) * 100
 
-        # ---------- STEP 3: AZURE OPENAI (TEXT RECOMMENDATIONS) ----------
-        system_prompt = """
-        You are an expert agricultural scientist.
-        Given a crop name and disease name, return ONLY valid JSON:
+def read_report_images(fileobj):
+    from imaging import make_thumbnail
+    fileobj.seek(0)
+    data = fileobj.read()
+    fileobj.seek(0)
+    return data, make_thumbnail(io.BytesIO(data))
 
-        {
-          "cause": "",
-          "symptoms": [],
-          "treatment": "",
-          "recommended_fertilizer": "",
-          "recommended_medicine": "",
-          "severity": "Low/Medium/High/Critical"
-        }
-        """
-
-        user_prompt = f"""
-        Crop: {crop_name}
-        Disease: {disease_name}
-        """
-
-        if azure_client:
-            response = azure_client.chat.completions.create(
-                model=os.environ.get("AZURE_OPENAI_API_NAME", "gpt-4o"),
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                max_tokens=500
-            )
-            ai_text = response.choices[0].message.content
-        else:
-            ai_text = json.dumps({
-             "cause": "AI service not configured",
-             "symptoms": [],
-             "treatment": "N/A",
-            "recommended_fertilizer": "N/A",
-            "recommended_medicine": "N/A",
-            "severity": "Unknown"
-        })
 
-        if azure_client:
-            try:
-                    response = azure_client.chat.completions.create(
-                        model=os.environ.get("AZURE_OPENAI_API_NAME", "gpt-4o"),
-                        messages=[
-                            {"role": "system", "content": system_prompt},
-                            {"role": "user", "content": user_prompt}
-                        ],
-                        max_tokens=500,
-                        timeout=15
-                    )
-
-                    ai_text = response.choices[0].message.content
-
-                    if "```json" in ai_text:
-                        ai_text = ai_text.split("```json")[1].split("```")[0]
-                    elif "```" in ai_text:
-                        ai_text = ai_text.split("```")[1].split("```")[0]
-
-                    info = json.loads(ai_text)
-                    
-            except Exception as e:
-                    logging.warning(f"Azure OpenAI failed: {e}")
-                    info = {
-                            "cause": "Unknown",
-                            "symptoms": [],
-                            "treatment": "N/A",
-                            "recommended_fertilizer": "N/A",
-                            "recommended_medicine": "N/A",
-                            "severity": "Unknown"
-                    }
-        else:
-            info = {
-                "cause": "AI service not configured",
-                "symptoms": [],
-                "treatment": "N/A",
-                "recommended_fertilizer": "N/A",
-                "recommended_medicine": "N/A",
-                "severity": "Unknown"
-            }
+async def store_report_images(fileobj, deadline: Optional[float] = None) -> dict:
+    """Save an upload and its thumbnail; returns the references to keep on the report."""
+    try:
+        data, thumbnail = await run_when_free(
+            lambda: inference_executor.run(read_report_images, fileobj), deadline
+        )
+        image_id, thumbnail_id = await asyncio.gather(blob_store.put(data), blob_store.put(thumbnail))
+    except Exception as e:
+        # The diagnosis is still worth saving without its photo.
+        logging.warning(f"Could not store report image: {e}")
+        return {}
+    return {"image_id": image_id, "thumbnail_id": thumbnail_id}
+
+
+def build_report_doc(user_id: str, result: dict, info: dict, details_pending: bool):
+    report = DiseaseReport(
+        user_id=user_id,
+        crop_name=result["crop"],
+        disease_name=result["disease"],
+        cause=info["cause"],
+        symptoms=info["symptoms"],
+        treatment=info["treatment"],
+        recommended_fertilizer=info["recommended_fertilizer"],
+        recommended_medicine=info["recommended_medicine"],
+        severity=info["severity"],
+        details_pending=details_pending
+    )
 
+    doc = report.model_dump()
+    doc["crop_confidence"] = result["crop_confidence"]
+    doc["disease_confidence"] = result["disease_confidence"]
+    return doc
 
-        # ---------- SAVE REPORT ----------
-        report = DiseaseReport(
-            user_id=user_id,
-            crop_name=crop_name,
-            disease_name=disease_name,
-            cause=info["cause"],
-            symptoms=info["symptoms"],
-            treatment=info["treatment"],
-            recommended_fertilizer=info["recommended_fertilizer"],
-            recommended_medicine=info["recommended_medicine"],
-            severity=info["severity"]
-        )
 
-        doc = report.model_dump()
-        doc["created_at"] = doc["created_at"].isoformat()
-        doc["crop_confidence"] = round(crop_confidence, 2)
-        doc["disease_confidence"] = round(disease_confidence, 2)
+@api_router.post("/detect-disease")
+async def detect_disease(
+    user_id: str = Form(...),
+    image: UploadFile = File(...)
+):
+    deadline = asyncio.get_running_loop().time() + DETECTION_DEADLINE_SECONDS
+    await check_upload_size(image)
 
+    try:
+        # ---------- STEP 1+2: CROP & DISEASE PREDICTION (ML, batched / cached) ----------
+        result = await classify_upload(image.file)
+
+        # ---------- STEP 3: AZURE OPENAI (TEXT RECOMMENDATIONS, cached) ----------
+        # The image and thumbnail are stored while the recommendation is fetched.
+        (info, details_pending, recommendation_task), images, location = await asyncio.gather(
+            recommendation_before(result, deadline),
+            store_report_images(image.file),
+            report_location(user_id),
+        )
+
+        # ---------- SAVE REPORT ----------
+        doc = build_report_doc(user_id, result, info, details_pending)
+        doc.update(images, **location)
         await db.disease_reports.insert_one(doc)
+        await record_heat([doc])
+
+        if details_pending:
+            spawn_background(complete_pending_report(doc["id"], recommendation_task))
 
         return {
             "success": True,
-            "crop": crop_name,
-            "crop_confidence": round(crop_confidence, 2),
-            "disease": disease_name,
-            "disease_confidence": round(disease_confidence, 2),
-            "details": info
+            "crop": result["crop"],
+            "crop_confidence": result["crop_confidence"],
+            "disease": result["disease"],
+            "disease_confidence": result["disease_confidence"],
+            "details": info,
+            "details_pending": details_pending
         }
 
+    except InferenceSaturated as e:
+        unavailable = isinstance(e, InferenceUnavailable)
+        return JSONResponse(
+            status_code=503,
+            headers={"Retry-After": str(e.retry_after)},
+            content={
+                "success": False,
+                "error": "Disease detection is temporarily unavailable" if unavailable
+                else "Disease detection is busy, please retry shortly",
+            }
+        )
+
     except Exception as e:
         logging.exception("❌ Disease detection failed")
         return JSONResponse(
@@ -515,21 +1272,602 @@ async def detect_disease(
 
 
 
+# ========== BATCH DISEASE DETECTION ==========
+
+MAX_BATCH_IMAGES = int(os.environ.get("MAX_BATCH_IMAGES", 100))
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", 32))
+# How long one batch item keeps retrying while inference is saturated.
+BATCH_SATURATION_WAIT = float(os.environ.get("BATCH_SATURATION_WAIT", 60))
+BATCH_INSERT_SIZE = 50
+MAX_ARCHIVE_BYTES = int(os.environ.get("MAX_ARCHIVE_BYTES", 100 * 1024 * 1024))
+MAX_ARCHIVE_UNCOMPRESSED_BYTES = int(os.environ.get("MAX_ARCHIVE_UNCOMPRESSED_BYTES", 200 * 1024 * 1024))
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+upload_body_limits["/api/detect-disease/batch"] = (
+    MAX_ARCHIVE_BYTES + MAX_BATCH_IMAGES * MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES,
+    "Batch upload too large",
+)
+
+
+def detach_upload(upload: UploadFile):
+    # FastAPI closes form uploads when the handler returns, which is before a
+    # StreamingResponse body runs; take the spooled file so it stays open.
+    fileobj = upload.file
+    upload.file = io.BytesIO()
+    return fileobj
+
+
+def list_zip_images(fileobj):
+    """Open an archive and list its image entries; members are read later, one per item."""
+    archive = zipfile.ZipFile(fileobj)
+    try:
+        items, total = [], 0
+        for entry in archive.infolist():
+            if entry.is_dir() or not entry.filename.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            if len(items) >= MAX_BATCH_IMAGES:
+                raise HTTPException(status_code=400, detail=f"Too many images (max {MAX_BATCH_IMAGES})")
+            if entry.file_size > MAX_UPLOAD_BYTES:
+                items.append((entry.filename, None))
+                continue
+            total += entry.file_size
+            if total > MAX_ARCHIVE_UNCOMPRESSED_BYTES:
+                raise HTTPException(status_code=400, detail="Archive contents are too large")
+            items.append((entry.filename, entry))
+    except BaseException:
+        archive.close()
+        raise
+    return archive, items
+
+
+def read_zip_entry(archive, entry):
+    return io.BytesIO(archive.read(entry))
+
+
+@api_router.post("/detect-disease/batch")
+async def detect_disease_batch(
+    user_id: str = Form(...),
+    images: List[UploadFile] = File(None),
+    archive: Optional[UploadFile] = File(None)
+):
+    images = images or []
+    if len(images) > MAX_BATCH_IMAGES:
+        raise HTTPException(status_code=400, detail=f"Too many images (max {MAX_BATCH_IMAGES})")
+
+    items, zip_archive, archive_file = [], None, None
+    if archive is not None:
+        if archive.size is not None and archive.size > MAX_ARCHIVE_BYTES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Archive too large (max {MAX_ARCHIVE_BYTES // (1024 * 1024)}MB)"
+            )
+        archive_file = detach_upload(archive)
+        try:
+            zip_archive, entries = await asyncio.to_thread(list_zip_images, archive_file)
+        except zipfile.BadZipFile:
+            archive_file.close()
+            raise HTTPException(status_code=400, detail="Archive is not a valid zip file")
+        except HTTPException:
+            archive_file.close()
+            raise
+        items.extend(entries)
+    for upload in images:
+        too_large = upload.size is not None and upload.size > MAX_UPLOAD_BYTES
+        items.append((upload.filename, None if too_large else detach_upload(upload)))
+    if not items or len(items) > MAX_BATCH_IMAGES:
+        if zip_archive is not None:
+            zip_archive.close()
+            archive_file.close()
+        if not items:
+            raise HTTPException(status_code=400, detail="No images provided")
+        raise HTTPException(status_code=400, detail=f"Too many images (max {MAX_BATCH_IMAGES})")
+
+    # Images are submitted concurrently so the micro-batcher packs them into
+    # shared forward passes; recommendations are deduplicated per
+    # (crop, disease) by the recommendation cache. Each item holds at most one
+    # executor slot at a time, so capping concurrency at half the executor queue
+    # leaves room for other traffic; items that still hit a full queue wait.
+    semaphore = asyncio.Semaphore(max(1, min(BATCH_CONCURRENCY, inference_executor.max_queue // 2)))
+    location = await report_location(user_id)
+
+    async def analyze(index, filename, source):
+        entry = {"index": index, "filename": filename}
+        if source is None:
+            return {**entry, "success": False, "error": "Image too large"}, None
+        async with semaphore:
+            deadline = asyncio.get_running_loop().time() + BATCH_SATURATION_WAIT
+            fileobj = source
+            try:
+                if isinstance(source, zipfile.ZipInfo):
+                    # Archive members are only decompressed once their turn comes.
+                    fileobj = await asyncio.to_thread(read_zip_entry, zip_archive, source)
+                result = await run_when_free(lambda: classify_upload(fileobj), deadline)
+                (info, _, _), images = await asyncio.gather(
+                    recommendation_before(result, None),
+                    store_report_images(fileobj, deadline),
+                )
+            except InferenceUnavailable:
+                return {**entry, "success": False, "error": "Disease detection is unavailable"}, None
+            except InferenceSaturated:
+                return {**entry, "success": False, "error": "Disease detection is busy"}, None
+            except Exception as e:
+                logging.warning(f"Batch detection failed for {filename}: {e}")
+                return {**entry, "success": False, "error": "Disease detection failed"}, None
+            finally:
+                if not isinstance(fileobj, zipfile.ZipInfo):
+                    fileobj.close()
+        doc = build_report_doc(user_id, result, info, False)
+        doc.update(images, **location)
+        return {**entry, "success": True, "report_id": doc["id"], **result, "details": info}, doc
+
+    async def save(results):
+        # Reports are written before their lines go out, so a client never sees
+        # a report_id that a disconnect or write error then loses.
+        for start in range(0, len(results), BATCH_INSERT_SIZE):
+            chunk = results[start:start + BATCH_INSERT_SIZE]
+            docs = [doc for _, doc in chunk if doc is not None]
+            if not docs:
+                continue
+            failed = set()
+            try:
+                await db.disease_reports.insert_many(docs, ordered=False)
+            except BulkWriteError as e:
+                # Unordered inserts keep going past a bad document; only the ones
+                # listed in writeErrors are missing.
+                failed = {docs[error["index"]]["id"] for error in e.details.get("writeErrors", [])}
+                logging.error(f"Could not save {len(failed)} of {len(docs)} batch reports: {e}")
+            except Exception as e:
+                failed = {doc["id"] for doc in docs}
+                logging.error(f"Could not save batch reports: {e}")
+            if failed:
+                for i, (line, doc) in enumerate(chunk):
+                    if doc is not None and doc["id"] in failed:
+                        chunk[i] = ({
+                            "index": line["index"], "filename": line["filename"],
+                            "success": False, "error": "Could not save report",
+                        }, None)
+                results[start:start + BATCH_INSERT_SIZE] = chunk
+            await record_heat([doc for doc in docs if doc["id"] not in failed])
+        return results
+
+    async def stream():
+        pending = {
+            asyncio.ensure_future(analyze(i, filename, source))
+            for i, (filename, source) in enumerate(items)
+        }
+        succeeded = 0
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for line, doc in await save([task.result() for task in done]):
+                    if doc is not None:
+                        succeeded += 1
+                    yield json.dumps(line) + "\n"
+            yield json.dumps({"done": True, "total": len(items), "succeeded": succeeded}) + "\n"
+        finally:
+            for task in pending:
+                task.cancel()
+            for _, source in items:
+                if source is not None and not isinstance(source, zipfile.ZipInfo):
+                    source.close()
+            if zip_archive is not None:
+                zip_archive.close()
+                archive_file.close()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+
+
+# ========== DISEASE DETECTION JOBS ==========
+# Submit-and-poll mode for slow links: the upload is queued in the
+# detection_jobs collection and drained by a worker pool in every API process.
+# Jobs that keep failing are copied to detection_jobs_dead.
+
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", 5))
+JOB_RETRY_BASE_SECONDS = float(os.environ.get("JOB_RETRY_BASE_SECONDS", 5))
+JOB_LEASE_SECONDS = int(os.environ.get("JOB_LEASE_SECONDS", 120))
+JOB_POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", 1))
+JOB_TERMINAL_STATES = ("done", "failed")
+
+job_workers = []
+job_wakeup = asyncio.Event()
+
+
+class RecommendationUnavailable(Exception):
+    pass
+
+
+def public_job(job: dict) -> dict:
+    job = {k: v for k, v in job.items() if k not in ("_id", "image", "lease_until", "pending_report_id")}
+    for key in ("created_at", "updated_at", "run_at"):
+        if isinstance(job.get(key), datetime):
+            job[key] = job[key].isoformat()
+    return job
+
+
+async def claim_job():
+    now = datetime.now(timezone.utc)
+    return await db.detection_jobs.find_one_and_update(
+        {
+            "$or": [
+                {"status": "queued", "run_at": {"$lte": now}},
+                # A worker that died mid-job leaves an expired lease behind.
+                {"status": "running", "lease_until": {"$lt": now}},
+            ]
+        },
+        {
+            "$set": {
+                "status": "running",
+                "lease_until": now + timedelta(seconds=JOB_LEASE_SECONDS),
+                "updated_at": now,
+            },
+            "$inc": {"attempts": 1},
+        },
+        sort=[("run_at", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def process_job(job: dict):
+    result = job.get("result")
+    if result is None:
+        result = dict(await classify_upload(io.BytesIO(job["image"])))
+        # Persist the ML stage so retries only repeat the recommendation step.
+        await db.detection_jobs.update_one({"_id": job["_id"]}, {"$set": {"result": result}})
+
+    info, _, _ = await recommendation_before(result, None)
+    if info is AI_FAILED_INFO:
+        raise RecommendationUnavailable("AI recommendation failed")
+
+    # The report id is fixed on the job before the report is written, so an
+    # attempt that fails after the insert is retried into the same report.
+    report_id = job.get("pending_report_id")
+    if report_id is None:
+        report_id = str(uuid.uuid4())
+        await db.detection_jobs.update_one({"_id": job["_id"]}, {"$set": {"pending_report_id": report_id}})
+
+    doc = build_report_doc(job["user_id"], result, info, False)
+    doc["id"] = report_id
+    doc.update(await store_report_images(io.BytesIO(job["image"])))
+    doc.update(await report_location(job["user_id"]))
+    written = await db.disease_reports.update_one({"id": report_id}, {"$setOnInsert": doc}, upsert=True)
+    if written.upserted_id is not None:
+        # Only the attempt that created the report counts it.
+        await record_heat([doc])
+    await db.detection_jobs.update_one(
+        {"_id": job["_id"]},
+        {
+            "$set": {
+                "status": "done",
+                "result": result,
+                "details": info,
+                "report_id": doc["id"],
+                "updated_at": datetime.now(timezone.utc),
+            },
+            "$unset": {"image": "", "lease_until": "", "error": "", "pending_report_id": ""},
+        }
+    )
+
+
+async def fail_job(job: dict, error: Exception):
+    now = datetime.now(timezone.utc)
+    if job["attempts"] >= JOB_MAX_ATTEMPTS:
+        await db.detection_jobs_dead.replace_one(
+            {"_id": job["_id"]},
+            {**job, "error": str(error), "dead_lettered_at": now},
+            upsert=True
+        )
+        await db.detection_jobs.update_one(
+            {"_id": job["_id"]},
+            {
+                "$set": {"status": "failed", "error": str(error), "updated_at": now},
+                "$unset": {"image": "", "lease_until": ""},
+            }
+        )
+        logging.error(f"Detection job {job['_id']} dead-lettered after {job['attempts']} attempts: {error}")
+        return
+
+    backoff = JOB_RETRY_BASE_SECONDS * 2 ** (job["attempts"] - 1)
+    await db.detection_jobs.update_one(
+        {"_id": job["_id"]},
+        {
+            "$set": {
+                "status": "queued",
+                "error": str(error),
+                "run_at": now + timedelta(seconds=backoff),
+                "updated_at": now,
+            },
+            "$unset": {"lease_until": ""},
+        }
+    )
+
+
+async def requeue_saturated(job: dict, retry_after: float):
+    # Saturation is back-pressure, not a failure: refund the attempt claim_job took.
+    now = datetime.now(timezone.utc)
+    await db.detection_jobs.update_one(
+        {"_id": job["_id"]},
+        {
+            "$set": {"status": "queued", "run_at": now + timedelta(seconds=retry_after), "updated_at": now},
+            "$inc": {"attempts": -1},
+            "$unset": {"lease_until": ""},
+        }
+    )
+
+
+async def job_worker():
+    while True:
+        try:
+            job = await claim_job()
+        except Exception as e:
+            logging.warning(f"Detection job claim failed: {e}")
+            job = None
+        if job is None:
+            job_wakeup.clear()
+            try:
+                await asyncio.wait_for(job_wakeup.wait(), timeout=JOB_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        try:
+            await process_job(job)
+        except asyncio.CancelledError:
+            raise
+        except InferenceSaturated as e:
+            try:
+                await requeue_saturated(job, e.retry_after)
+            except Exception as requeue_error:
+                # The lease expires and another worker picks the job up again.
+                logging.error(f"Could not requeue detection job {job['_id']}: {requeue_error}")
+        except Exception as e:
+            logging.warning(f"Detection job {job['_id']} attempt {job['attempts']} failed: {e}")
+            try:
+                await fail_job(job, e)
+            except Exception as fail_error:
+                logging.error(f"Could not record failure of detection job {job['_id']}: {fail_error}")
+
+
+def start_job_workers():
+    for _ in range(JOB_WORKERS):
+        job_workers.append(asyncio.ensure_future(job_worker()))
+
+
+async def stop_job_workers():
+    for task in job_workers:
+        task.cancel()
+    await asyncio.gather(*job_workers, return_exceptions=True)
+    job_workers.clear()
+
+
+@api_router.post("/detect-disease/jobs", status_code=202)
+async def submit_detection_job(
+    user_id: str = Form(...),
+    image: UploadFile = File(...)
+):
+    await check_upload_size(image)
+    now = datetime.now(timezone.utc)
+    job_id = str(uuid.uuid4())
+    await db.detection_jobs.insert_one({
+        "_id": job_id,
+        "id": job_id,
+        "user_id": user_id,
+        "filename": image.filename,
+        "image": Binary(await image.read()),
+        "status": "queued",
+        "attempts": 0,
+        "run_at": now,
+        "created_at": now,
+        "updated_at": now,
+    })
+    job_wakeup.set()
+    return {"job_id": job_id, "status": "queued"}
+
+
+@api_router.get("/detect-disease/jobs/{job_id}")
+async def get_detection_job(job_id: str):
+    job = await db.detection_jobs.find_one({"_id": job_id}, {"image": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return public_job(job)
+
+
+@api_router.get("/detect-disease/jobs/{job_id}/events")
+async def stream_detection_job(job_id: str):
+    job = await db.detection_jobs.find_one({"_id": job_id}, {"image": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        last_status = None
+        current = job
+        while True:
+            if current is None:
+                yield "event: error\ndata: {\"error\": \"Job not found\"}\n\n"
+                return
+            if current["status"] != last_status:
+                last_status = current["status"]
+                yield f"event: status\ndata: {json.dumps(public_job(current))}\n\n"
+                if last_status in JOB_TERMINAL_STATES:
+                    return
+            else:
+                yield ": keep-alive\n\n"
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+            current = await db.detection_jobs.find_one({"_id": job_id}, {"image": 0})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+
+
+# ========== DISEASE HEATMAP ==========
+# Reports are stamped with their farm's GeoJSON point when written, and each
+# insert $incs a (grid cell, day, crop, disease) counter in disease_heat_cells.
+# The heatmap sums those counters for a bbox and window instead of scanning
+# reports. Cells are keyed by integer (row, col) grid indices, which are only
+# turned into degrees (the cell's south-west corner) in the response.
+
+HEATMAP_GRID_DEGREES = float(os.environ.get("HEATMAP_GRID_DEGREES", 0.1))
+HEATMAP_MAX_CELLS = 5000
+
+heatmap_cache = TTLCache(ttl=int(os.environ.get("HEATMAP_CACHE_TTL", 60)), max_size=256)
+
+
+async def report_location(user_id: str) -> dict:
+    try:
+        lat, lng = await get_farm_location(user_id)
+    except HTTPException:
+        return {}
+    except Exception as e:
+        logging.warning(f"Could not resolve farm location for {user_id}: {e}")
+        return {}
+    return {"location": {"type": "Point", "coordinates": [float(lng), float(lat)]}}
+
+
+def heat_update(doc: dict):
+    lng, lat = doc["location"]["coordinates"]
+    row, col = heat_cell(lat, lng, HEATMAP_GRID_DEGREES)
+    day = doc["created_at"].replace(hour=0, minute=0, second=0, microsecond=0)
+    crop, disease = doc.get("crop_name"), doc.get("disease_name")
+    return UpdateOne(
+        {"_id": f"{row}|{col}|{day:%Y-%m-%d}|{crop}|{disease}"},
+        {
+            "$inc": {"count": 1},
+            "$setOnInsert": {"row": row, "col": col, "day": day, "crop": crop, "disease": disease},
+        },
+        upsert=True
+    )
+
+
+async def record_heat(docs: list):
+    operations = [heat_update(doc) for doc in docs if doc.get("location")]
+    if not operations:
+        return
+    try:
+        await db.disease_heat_cells.bulk_write(operations, ordered=False)
+        heatmap_cache.clear()
+    except Exception as e:
+        logging.warning(f"Could not update heatmap cells: {e}")
+
+
+@api_router.get("/disease-reports/heatmap")
+async def get_disease_heatmap(
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lng: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lng: float = Query(..., ge=-180, le=180),
+    days: int = Query(30, ge=1, le=365),
+    crop: Optional[str] = None,
+    disease: Optional[str] = None
+):
+    if min_lat > max_lat or min_lng > max_lng:
+        raise HTTPException(status_code=400, detail="Bounding box min must not exceed max")
+
+    cache_key = (min_lat, min_lng, max_lat, max_lng, days, crop, disease)
+    cached = heatmap_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    since = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days)
+    # Every cell the box touches, including those whose corner lies outside it.
+    south, west = heat_cell(min_lat, min_lng, HEATMAP_GRID_DEGREES)
+    north, east = heat_cell(max_lat, max_lng, HEATMAP_GRID_DEGREES)
+    query = {
+        "day": {"$gte": since},
+        "row": {"$gte": south, "$lte": north},
+        "col": {"$gte": west, "$lte": east},
+    }
+    if crop:
+        query["crop"] = crop
+    if disease:
+        query["disease"] = disease
+
+    cells = await db.disease_heat_cells.aggregate([
+        {"$match": query},
+        {"$group": {"_id": {"row": "$row", "col": "$col"}, "count": {"$sum": "$count"}}},
+        {"$sort": {"count": -1}},
+        {"$limit": HEATMAP_MAX_CELLS},
+    ]).to_list(HEATMAP_MAX_CELLS)
+
+    result = {
+        "grid_degrees": HEATMAP_GRID_DEGREES,
+        "days": days,
+        "cells": [
+            {
+                "lat": cell_corner(c["_id"]["row"], HEATMAP_GRID_DEGREES),
+                "lng": cell_corner(c["_id"]["col"], HEATMAP_GRID_DEGREES),
+                "count": c["count"],
+            }
+            for c in cells
+        ],
+    }
+    heatmap_cache.set(cache_key, result)
+    return result
+
 @api_router.get("/disease-reports/{user_id}", response_model=List[DiseaseReport])
-async def get_user_disease_reports(user_id: str):
-    reports = await db.disease_reports.find({"user_id": user_id}, {"_id": 0}).to_list(100)
-    for report in reports:
-        if isinstance(report.get('created_at'), str):
-            report['created_at'] = datetime.fromisoformat(report['created_at'])
-    return [DiseaseReport(**r) for r in reports]
+async def get_user_disease_reports(
+    user_id: str,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None
+):
+    reports, next_cursor = await fetch_page(
+        db.disease_reports, {"user_id": user_id}, model_projection(DiseaseReport), limit, cursor
+    )
+    return documents_response(reports, next_cursor)
 
 @api_router.get("/disease-reports", response_model=List[DiseaseReport])
-async def get_all_disease_reports():
-    reports = await db.disease_reports.find({}, {"_id": 0}).to_list(1000)
-    for report in reports:
-        if isinstance(report.get('created_at'), str):
-            report['created_at'] = datetime.fromisoformat(report['created_at'])
-    return [DiseaseReport(**r) for r in reports]
+async def get_all_disease_reports(
+    limit: int = Query(1000, ge=1, le=1000),
+    cursor: Optional[str] = None
+):
+    reports, next_cursor = await fetch_page(db.disease_reports, {}, model_projection(DiseaseReport), limit, cursor)
+    return documents_response(reports, next_cursor)
+
+# ========== REPORT IMAGES ==========
+
+IMAGE_ID_RE = re.compile(r"[0-9a-f]{64}")
+# Blobs are addressed by their sha256, so a URL's bytes never change.
+IMAGE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+@api_router.get("/images/{image_id}")
+async def get_image(image_id: str, request: Request):
+    if not IMAGE_ID_RE.fullmatch(image_id):
+        raise HTTPException(status_code=404, detail="Image not found")
+    try:
+        blob = await blob_store.stat(image_id)
+    except BlobNotFound:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    etag = f'"{image_id}"'
+    headers = {"ETag": etag, "Cache-Control": IMAGE_CACHE_CONTROL, "Accept-Ranges": "bytes"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    size = blob["size"]
+    start, end, status_code = 0, size - 1, 200
+    range_header = request.headers.get("range")
+    if range_header and request.headers.get("if-range", etag) == etag:
+        try:
+            byte_range = parse_range(range_header, size)
+        except RangeNotSatisfiable:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        if byte_range is not None:
+            start, end = byte_range
+            status_code = 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        blob_store.stream(image_id, start, end),
+        status_code=status_code,
+        media_type=blob["content_type"],
+        headers=headers,
+    )
 
 # ========== CROP CALENDAR ==========
 
@@ -537,17 +1875,19 @@ async def get_all_disease_reports():
 async def create_calendar_entry(entry: CropCalendarCreate):
     entry_obj = CropCalendarEntry(**entry.model_dump())
     doc = entry_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     await db.crop_calendar.insert_one(doc)
     return entry_obj
 
 @api_router.get("/crop-calendar/{user_id}", response_model=List[CropCalendarEntry])
-async def get_user_calendar(user_id: str):
-    entries = await db.crop_calendar.find({"user_id": user_id}, {"_id": 0}).to_list(100)
-    for entry in entries:
-        if isinstance(entry.get('created_at'), str):
-            entry['created_at'] = datetime.fromisoformat(entry['created_at'])
-    return [CropCalendarEntry(**e) for e in entries]
+async def get_user_calendar(
+    user_id: str,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None
+):
+    entries, next_cursor = await fetch_page(
+        db.crop_calendar, {"user_id": user_id}, model_projection(CropCalendarEntry), limit, cursor
+    )
+    return documents_response(entries, next_cursor)
 
 @api_router.put("/crop-calendar/{entry_id}")
 async def update_calendar_entry(entry_id: str, completed: bool):
@@ -567,11 +1907,31 @@ async def delete_calendar_entry(entry_id: str):
     return {"message": "Entry deleted"}
 
 # ========== WEATHER API ==========
+# Forecasts are cached per grid cell: farms within WEATHER_GRID_DEGREES of each
+# other share one open-meteo call. Entries go stale a few minutes after each
+# hour (open-meteo's update cadence) and are refreshed in the background, and
+# the hottest cells are prefetched before they expire.
+
+WEATHER_GRID_DEGREES = float(os.environ.get("WEATHER_GRID_DEGREES", 0.05))
+WEATHER_REFRESH_OFFSET = int(os.environ.get("WEATHER_REFRESH_OFFSET", 300))
+WEATHER_STALE_TTL = int(os.environ.get("WEATHER_STALE_TTL", 3 * 3600))
+WEATHER_PREFETCH_INTERVAL = int(os.environ.get("WEATHER_PREFETCH_INTERVAL", 300))
+WEATHER_PREFETCH_CELLS = int(os.environ.get("WEATHER_PREFETCH_CELLS", 50))
+
+
+def weather_cell(lat: float, lng: float):
+    grid = WEATHER_GRID_DEGREES
+    return round(round(float(lat) / grid) * grid, 4), round(round(float(lng) / grid) * grid, 4)
+
+
+def seconds_until_weather_update() -> float:
+    now = datetime.now(timezone.utc)
+    next_hour = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    return (next_hour - now).total_seconds() + WEATHER_REFRESH_OFFSET
 
-@api_router.get("/weather/{firebase_uid}")
-async def get_weather(firebase_uid: str):
-    lat, lng = get_farm_location_from_firebase(firebase_uid)
 
+async def fetch_weather(cell):
+    lat, lng = cell
     url = (
         f"https://api.open-meteo.com/v1/forecast"
         f"?latitude={lat}&longitude={lng}"
@@ -581,117 +1941,449 @@ async def get_weather(firebase_uid: str):
         f"&forecast_days=5"
         f"&timezone=auto"
     )
+    response = await upstreams["weather"].get(url)
+    response.raise_for_status()
+    return response.json()
+
+
+weather_cache = StaleWhileRevalidateCache(
+    fetch_weather,
+    ttl=seconds_until_weather_update,
+    stale_ttl=WEATHER_STALE_TTL,
+    max_size=int(os.environ.get("WEATHER_CACHE_SIZE", 4096)),
+)
+
+
+async def prefetch_weather():
+    while True:
+        await asyncio.sleep(WEATHER_PREFETCH_INTERVAL)
+        for cell in weather_cache.hottest(WEATHER_PREFETCH_CELLS):
+            if weather_cache.expires_within(cell, WEATHER_PREFETCH_INTERVAL):
+                weather_cache.refresh_in_background(cell)
+        weather_cache.decay_heat()
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url)
-        response.raise_for_status()
-        return response.json()
+
+@api_router.get("/weather/{firebase_uid}")
+async def get_weather(firebase_uid: str):
+    lat, lng = await get_farm_location(firebase_uid)
+
+    try:
+        return await weather_cache.get(weather_cell(lat, lng))
+    except CircuitOpen as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Weather service temporarily unavailable",
+            headers={"Retry-After": str(int(e.retry_after) + 1)}
+        )
+    except httpx.HTTPError as e:
+        logging.error(f"Weather API error: {e}")
+        raise HTTPException(status_code=502, detail="Weather service error")
 
 
 
 # ========== NEWS API ==========
+# Articles are ingested on a schedule into the news_articles collection
+# (deduplicated by URL) and served from an in-memory snapshot. Only one
+# worker per interval calls gnews.io; the others reload the snapshot from Mongo.
+
+NEWS_REFRESH_INTERVAL = int(os.environ.get("NEWS_REFRESH_INTERVAL", 1800))
+NEWS_SNAPSHOT_SIZE = int(os.environ.get("NEWS_SNAPSHOT_SIZE", 100))
+NEWS_QUERY = os.environ.get("NEWS_QUERY", "agriculture farming india")
+
+FALLBACK_NEWS = [
+    {
+        "title": "Government Announces New Farmer Subsidy Scheme",
+        "description": "The Ministry of Agriculture has announced a new subsidy scheme for small and marginal farmers.",
+        "url": "#",
+        "image": "https://images.unsplash.com/photo-1589292144899-2f43a71a1b2b",
+        "source": {"name": "Agriculture Today"}
+    },
+    {
+        "title": "Monsoon Forecast: Above Normal Rainfall Expected",
+        "description": "IMD predicts above normal rainfall during the upcoming monsoon season, beneficial for Kharif crops.",
+        "url": "#",
+        "image": "https://images.unsplash.com/photo-1696371269777-88d1ce71642c",
+        "source": {"name": "Weather India"}
+    },
+    {
+        "title": "New Pest-Resistant Wheat Variety Released",
+        "description": "ICAR releases new wheat variety with resistance to yellow rust and better yield potential.",
+        "url": "#",
+        "image": "https://images.unsplash.com/photo-1645439162146-b2b94da3d55b",
+        "source": {"name": "Krishi Jagran"}
+    }
+]
+
+news_snapshot = {"articles": [], "etag": None, "updated_at": None}
+
+
+async def fetch_news_articles():
+    api_key = os.environ.get('NEWS_API_KEY')
+    if not api_key:
+        return []
+    response = await upstreams["news"].get(
+        "https://gnews.io/api/v4/search",
+        params={"q": NEWS_QUERY, "lang": "en", "country": "in", "max": 10, "apikey": api_key}
+    )
+    response.raise_for_status()
+    return response.json().get("articles", [])
+
+
+async def ingest_news():
+    articles = await fetch_news_articles()
+    now = datetime.now(timezone.utc)
+    for article in articles:
+        if not article.get("url"):
+            continue
+        await db.news_articles.update_one(
+            {"url": article["url"]},
+            {"$set": {**article, "fetched_at": now}},
+            upsert=True
+        )
+    return len(articles)
+
+
+async def reload_news_snapshot():
+    articles = await db.news_articles.find({}, {"_id": 0, "fetched_at": 0}) \
+        .sort("publishedAt", -1).limit(NEWS_SNAPSHOT_SIZE).to_list(NEWS_SNAPSHOT_SIZE)
+    # Keep serving the last good snapshot rather than replacing it with nothing.
+    if not articles:
+        return
+    digest = hashlib.sha1(json.dumps(articles, sort_keys=True, default=str).encode()).hexdigest()
+    news_snapshot.update(articles=articles, etag=digest[:16], updated_at=datetime.now(timezone.utc).isoformat())
+
+
+async def news_refresher():
+    while True:
+        try:
+            if await claim_scheduled_run("news", NEWS_REFRESH_INTERVAL):
+                count = await ingest_news()
+                logging.info(f"News refresh ingested {count} articles")
+        except Exception as e:
+            logging.error(f"News API error: {str(e)}")
+        try:
+            await reload_news_snapshot()
+        except Exception as e:
+            logging.warning(f"News snapshot reload failed: {e}")
+        await asyncio.sleep(min(NEWS_REFRESH_INTERVAL, 300))
+
 
 @api_router.get("/news")
-async def get_farming_news():
-    try:
-        api_key = os.environ.get('NEWS_API_KEY')
-        url = f"https://gnews.io/api/v4/search?q=agriculture+farming+india&lang=en&country=in&max=10&apikey={api_key}"
-        
-        async with httpx.AsyncClient() as http_client:
-            response = await http_client.get(url)
-            data = response.json()
-            
-            if "articles" in data:
-                return {"articles": data["articles"]}
-            
-            # Fallback dummy data
-            return {
-                "articles": [
-                    {
-                        "title": "Government Announces New Farmer Subsidy Scheme",
-                        "description": "The Ministry of Agriculture has announced a new subsidy scheme for small and marginal farmers.",
-                        "url": "#",
-                        "image": "https://images.unsplash.com/photo-1589292144899-2f43a71a1b2b",
-                        "publishedAt": datetime.now(timezone.utc).isoformat(),
-                        "source": {"name": "Agriculture Today"}
-                    },
-                    {
-                        "title": "Monsoon Forecast: Above Normal Rainfall Expected",
-                        "description": "IMD predicts above normal rainfall during the upcoming monsoon season, beneficial for Kharif crops.",
-                        "url": "#",
-                        "image": "https://images.unsplash.com/photo-1696371269777-88d1ce71642c",
-                        "publishedAt": datetime.now(timezone.utc).isoformat(),
-                        "source": {"name": "Weather India"}
-                    },
-                    {
-                        "title": "New Pest-Resistant Wheat Variety Released",
-                        "description": "ICAR releases new wheat variety with resistance to yellow rust and better yield potential.",
-                        "url": "#",
-                        "image": "https://images.unsplash.com/photo-1645439162146-b2b94da3d55b",
-                        "publishedAt": datetime.now(timezone.utc).isoformat(),
-                        "source": {"name": "Krishi Jagran"}
-                    }
-                ]
-            }
-    except Exception as e:
-        logging.error(f"News API error: {str(e)}")
-        # Return fallback data on error
-        return {
-            "articles": [
-                {
-                    "title": "Government Announces New Farmer Subsidy Scheme",
-                    "description": "The Ministry of Agriculture has announced a new subsidy scheme.",
-                    "url": "#",
-                    "image": "https://images.unsplash.com/photo-1589292144899-2f43a71a1b2b",
-                    "publishedAt": datetime.now(timezone.utc).isoformat(),
-                    "source": {"name": "Agriculture Today"}
-                }
-            ]
+async def get_farming_news(request: Request, page: int = Query(1, ge=1), page_size: int = Query(10, ge=1, le=50)):
+    articles = news_snapshot["articles"]
+    if not articles:
+        published = datetime.now(timezone.utc).isoformat()
+        return {"articles": [{**a, "publishedAt": published} for a in FALLBACK_NEWS], "source": "fallback"}
+
+    etag = f'W/"{news_snapshot["etag"]}-{page}-{page_size}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=60"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    start = (page - 1) * page_size
+    return JSONResponse(
+        headers=headers,
+        content={
+            "articles": articles[start:start + page_size],
+            "page": page,
+            "page_size": page_size,
+            "total": len(articles),
+            "updated_at": news_snapshot["updated_at"],
+            "source": "cache",
         }
+    )
 
 # ========== MARKET PRICES ==========
+# The data.gov.in mandi price resource is bulk-synced on a schedule into the
+# market_prices collection; /market-prices queries that local copy only.
 
-@api_router.get("/market-prices")
-async def get_market_prices():
+MARKET_SYNC_INTERVAL = int(os.environ.get("MARKET_SYNC_INTERVAL", 3 * 3600))
+MARKET_SYNC_PAGE_SIZE = int(os.environ.get("MARKET_SYNC_PAGE_SIZE", 1000))
+# Only orders with a backing index (see required_indexes) are offered.
+MARKET_SORT_FIELDS = {"arrival_date", "modal_price"}
+
+FALLBACK_PRICES = [
+    {"commodity": "Wheat", "market": "Azadpur", "state": "Delhi", "min_price": "2100", "max_price": "2300", "modal_price": "2200"},
+    {"commodity": "Rice", "market": "Vashi", "state": "Maharashtra", "min_price": "3200", "max_price": "3500", "modal_price": "3350"},
+    {"commodity": "Tomato", "market": "Koyambedu", "state": "Tamil Nadu", "min_price": "1500", "max_price": "2000", "modal_price": "1750"},
+    {"commodity": "Onion", "market": "Lasalgaon", "state": "Maharashtra", "min_price": "800", "max_price": "1200", "modal_price": "1000"},
+    {"commodity": "Potato", "market": "Azadpur", "state": "Delhi", "min_price": "1000", "max_price": "1400", "modal_price": "1200"},
+    {"commodity": "Cotton", "market": "Rajkot", "state": "Gujarat", "min_price": "6500", "max_price": "7200", "modal_price": "6850"},
+    {"commodity": "Soybean", "market": "Indore", "state": "Madhya Pradesh", "min_price": "4200", "max_price": "4600", "modal_price": "4400"},
+    {"commodity": "Groundnut", "market": "Gondal", "state": "Gujarat", "min_price": "5500", "max_price": "6000", "modal_price": "5750"}
+]
+
+market_query_cache = TTLCache(ttl=int(os.environ.get("MARKET_QUERY_CACHE_TTL", 60)), max_size=2048)
+
+
+async def sync_market_prices():
+    """Page through the whole resource; returns (records written, arrival dates they touch).
+
+    Records that are already stored with the same prices are skipped.
+    """
     api_key = os.environ.get("MARKET_API_KEY")
     resource_id = os.environ.get("MARKET_RESOURCE_ID")
-
-    # ✅ If API not configured → dummy immediately
     if not api_key or not resource_id:
-        return {
-            "prices": [
-                {"commodity": "Wheat", "market": "Azadpur", "state": "Delhi", "modal_price": "2200"}
-            ],
-            "source": "dummy"
-        }
+        return 0, set()
 
-    try:
-        url = f"https://api.data.gov.in/resource/{resource_id}?api-key={api_key}&format=json&limit=50"
+    synced, dates, offset = 0, set(), 0
+    while True:
+        response = await upstreams["market"].get(
+            f"https://api.data.gov.in/resource/{resource_id}",
+            params={"api-key": api_key, "format": "json", "limit": MARKET_SYNC_PAGE_SIZE, "offset": offset}
+        )
+        response.raise_for_status()
+        records = response.json().get("records", [])
+
+        docs = {}
+        for record in records:
+            doc = normalize_market_record(record)
+            if doc is not None:
+                docs[doc["_id"]] = doc
+        # Only new rows and rows whose prices moved are written, and only their
+        # arrival dates are regrouped into the daily aggregates afterwards.
+        stored = {}
+        if docs:
+            projection = {field: 1 for field in MARKET_PRICE_FIELDS}
+            async for row in db.market_prices.find({"_id": {"$in": list(docs)}}, projection):
+                stored[row["_id"]] = row
+
+        now = datetime.now(timezone.utc)
+        operations = []
+        for doc in docs.values():
+            if not market_row_changed(stored.get(doc["_id"]), doc):
+                continue
+            dates.add(doc["arrival_date"])
+            operations.append(UpdateOne(
+                {"_id": doc["_id"]},
+                {"$set": {**doc, "synced_at": now}},
+                upsert=True
+            ))
+        if operations:
+            await db.market_prices.bulk_write(operations, ordered=False)
+
+        synced += len(operations)
+        offset += len(records)
+        if len(records) < MARKET_SYNC_PAGE_SIZE:
+            break
+
+    market_query_cache.clear()
+    return synced, dates
+
+
+async def market_price_syncer():
+    while True:
+        try:
+            if await claim_scheduled_run("market_prices", MARKET_SYNC_INTERVAL):
+                synced, dates = await sync_market_prices()
+                logging.info(f"Market price sync stored {synced} new or changed records")
+                if not await db.market_price_daily.estimated_document_count():
+                    await refresh_market_aggregates()
+                elif dates:
+                    await refresh_market_aggregates(dates)
+        except Exception as e:
+            logging.error(f"Market API error: {e}")
+        await asyncio.sleep(min(MARKET_SYNC_INTERVAL, 600))
+
+
+def public_price(doc: dict) -> dict:
+    doc = dict(doc)
+    doc.pop("synced_at", None)
+    doc["id"] = doc.pop("_id")
+    doc["arrival_date"] = doc["arrival_date"].strftime(MARKET_DATE_FORMAT)
+    return doc
 
-        async with httpx.AsyncClient(timeout=10) as http_client:
-            response = await http_client.get(url)
-            response.raise_for_status()
-            data = response.json()
 
-            if "records" in data:
-                return {"prices": data["records"], "source": "live"}
+@api_router.get("/market-prices")
+async def get_market_prices(
+    commodity: Optional[str] = None,
+    state: Optional[str] = None,
+    market: Optional[str] = None,
+    district: Optional[str] = None,
+    date_from: Optional[str] = Query(None, description="YYYY-MM-DD"),
+    date_to: Optional[str] = Query(None, description="YYYY-MM-DD"),
+    sort: str = "arrival_date",
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None
+):
+    if sort not in MARKET_SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {sorted(MARKET_SORT_FIELDS)}")
 
-    except Exception as e:
-        logging.error(f"Market API error: {e}")
-    
-    # Fallback dummy data
-    return {
-        "prices": [
-            {"commodity": "Wheat", "market": "Azadpur", "state": "Delhi", "min_price": "2100", "max_price": "2300", "modal_price": "2200"},
-            {"commodity": "Rice", "market": "Vashi", "state": "Maharashtra", "min_price": "3200", "max_price": "3500", "modal_price": "3350"},
-            {"commodity": "Tomato", "market": "Koyambedu", "state": "Tamil Nadu", "min_price": "1500", "max_price": "2000", "modal_price": "1750"},
-            {"commodity": "Onion", "market": "Lasalgaon", "state": "Maharashtra", "min_price": "800", "max_price": "1200", "modal_price": "1000"},
-            {"commodity": "Potato", "market": "Azadpur", "state": "Delhi", "min_price": "1000", "max_price": "1400", "modal_price": "1200"},
-            {"commodity": "Cotton", "market": "Rajkot", "state": "Gujarat", "min_price": "6500", "max_price": "7200", "modal_price": "6850"},
-            {"commodity": "Soybean", "market": "Indore", "state": "Madhya Pradesh", "min_price": "4200", "max_price": "4600", "modal_price": "4400"},
-            {"commodity": "Groundnut", "market": "Gondal", "state": "Gujarat", "min_price": "5500", "max_price": "6000", "modal_price": "5750"}
-        ]
-    }
+    cache_key = (commodity, state, market, district, date_from, date_to, sort, order, limit, cursor)
+    cached = market_query_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    query = {k: v for k, v in {"commodity": commodity, "state": state, "market": market, "district": district}.items() if v}
+    try:
+        date_range = {}
+        if date_from:
+            date_range["$gte"] = datetime.fromisoformat(date_from).replace(tzinfo=timezone.utc)
+        if date_to:
+            date_range["$lte"] = datetime.fromisoformat(date_to).replace(tzinfo=timezone.utc)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD")
+    if date_range:
+        query["arrival_date"] = date_range
+
+    direction = -1 if order == "desc" else 1
+    if cursor:
+        position = read_cursor(cursor, {"v", "id"})
+        if (
+            not isinstance(position["id"], str)
+            or not (position["v"] is None or isinstance(position["v"], (str, int, float, datetime)))
+        ):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = {"$and": [query, keyset_after(sort, position["v"], position["id"], direction)]}
+
+    docs = await db.market_prices.find(query, {"synced_at": 0}, collation=MARKET_COLLATION) \
+        .sort([(sort, direction), ("_id", direction)]).limit(limit).to_list(limit)
+
+    if not docs and not cursor and not query:
+        # Nothing synced yet (or market API not configured).
+        configured = os.environ.get("MARKET_API_KEY") and os.environ.get("MARKET_RESOURCE_ID")
+        return {"prices": FALLBACK_PRICES, "source": "fallback" if configured else "dummy", "next_cursor": None}
+
+    next_cursor = None
+    if len(docs) == limit:
+        last = docs[-1]
+        next_cursor = encode_cursor({"v": last.get(sort), "id": last["_id"]})
+
+    result = {"prices": [public_price(d) for d in docs], "source": "local", "next_cursor": next_cursor}
+    market_query_cache.set(cache_key, result)
+    return result
+
+# ========== MARKET PRICE TRENDS ==========
+# Daily per-(commodity, state, market) aggregates live in market_price_daily.
+# After each sync only the arrival dates that changed are regrouped, and the
+# rolling windows are recomputed for the 30 days they can influence, using
+# Mongo $merge / $setWindowFields. /market-prices/trends only reads that
+# collection, never the raw rows.
+
+MARKET_TREND_WINDOW_DAYS = 30
+MARKET_TREND_MAX_SERIES = 20
+
+market_trend_cache = TTLCache(ttl=int(os.environ.get("MARKET_QUERY_CACHE_TTL", 60)), max_size=1024)
+
+
+async def refresh_market_aggregates(dates=None):
+    """Rebuild daily aggregates for `dates` (all dates when None) and their rolling windows."""
+    window = timedelta(days=MARKET_TREND_WINDOW_DAYS)
+    group_stage = [] if dates is None else [{"$match": {"arrival_date": {"$in": sorted(dates)}}}]
+    group_stage += [
+        {"$group": {
+            "_id": {"commodity": "$commodity", "state": "$state", "market": "$market", "date": "$arrival_date"},
+            "avg_modal": {"$avg": "$modal_price"},
+            "min_price": {"$min": "$min_price"},
+            "max_price": {"$max": "$max_price"},
+            "records": {"$sum": 1},
+        }},
+        {"$project": {
+            "_id": {"$concat": [
+                {"$ifNull": ["$_id.commodity", ""]}, "|",
+                {"$ifNull": ["$_id.state", ""]}, "|",
+                {"$ifNull": ["$_id.market", ""]}, "|",
+                {"$dateToString": {"format": "%Y-%m-%d", "date": "$_id.date"}},
+            ]},
+            "commodity": "$_id.commodity",
+            "state": "$_id.state",
+            "market": "$_id.market",
+            "date": "$_id.date",
+            "avg_modal": 1,
+            "min_price": 1,
+            "max_price": 1,
+            "records": 1,
+        }},
+        {"$merge": {"into": "market_price_daily", "on": "_id", "whenMatched": "merge", "whenNotMatched": "insert"}},
+    ]
+    await db.market_prices.aggregate(group_stage).to_list(None)
+
+    window_stage = []
+    affected = None
+    if dates is not None:
+        first, last = min(dates), max(dates)
+        # Rows up to `window` after the last touched date can see it in their windows,
+        # and those rows need `window` of history before the first touched date.
+        window_stage.append({"$match": {"date": {"$gte": first - window, "$lte": last + window}}})
+        affected = {"$match": {"date": {"$gte": first, "$lte": last + window}}}
+    window_stage.append({"$setWindowFields": {
+        "partitionBy": {"commodity": "$commodity", "state": "$state", "market": "$market"},
+        "sortBy": {"date": 1},
+        "output": {
+            "rolling_7d_modal": {"$avg": "$avg_modal", "window": {"range": [-6, 0], "unit": "day"}},
+            "rolling_30d_modal": {"$avg": "$avg_modal", "window": {"range": [-29, 0], "unit": "day"}},
+            "band_7d_min": {"$min": "$min_price", "window": {"range": [-6, 0], "unit": "day"}},
+            "band_7d_max": {"$max": "$max_price", "window": {"range": [-6, 0], "unit": "day"}},
+            "prev_week_modal": {"$avg": "$avg_modal", "window": {"range": [-7, -7], "unit": "day"}},
+        },
+    }})
+    if affected:
+        window_stage.append(affected)
+    window_stage += [
+        {"$set": {"wow_change_pct": {"$cond": [
+            {"$gt": ["$prev_week_modal", 0]},
+            {"$multiply": [{"$divide": [{"$subtract": ["$avg_modal", "$prev_week_modal"]}, "$prev_week_modal"]}, 100]},
+            None,
+        ]}}},
+        {"$project": {
+            "rolling_7d_modal": 1, "rolling_30d_modal": 1, "band_7d_min": 1, "band_7d_max": 1,
+            "prev_week_modal": 1, "wow_change_pct": 1,
+        }},
+        {"$merge": {"into": "market_price_daily", "on": "_id", "whenMatched": "merge", "whenNotMatched": "discard"}},
+    ]
+    await db.market_price_daily.aggregate(window_stage).to_list(None)
+    market_trend_cache.clear()
+
+
+def round_or_none(value, digits=2):
+    return None if value is None else round(value, digits)
+
+
+@api_router.get("/market-prices/trends")
+async def get_market_price_trends(
+    commodity: str,
+    state: Optional[str] = None,
+    market: Optional[str] = None,
+    days: int = Query(30, ge=1, le=365)
+):
+    cache_key = (commodity, state, market, days)
+    cached = market_trend_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    since = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days)
+    query = {"commodity": commodity, "date": {"$gte": since}}
+    if state:
+        query["state"] = state
+    if market:
+        query["market"] = market
+
+    rows = await db.market_price_daily.find(query, {"_id": 0}, collation=MARKET_COLLATION) \
+        .sort([("state", 1), ("market", 1), ("date", 1)]).to_list(MARKET_TREND_MAX_SERIES * days)
+
+    series = {}
+    for row in rows:
+        key = (row["commodity"], row["state"], row["market"])
+        if key not in series:
+            if len(series) >= MARKET_TREND_MAX_SERIES:
+                continue
+            series[key] = {"commodity": key[0], "state": key[1], "market": key[2], "points": []}
+        series[key]["points"].append({
+            "date": row["date"].strftime("%Y-%m-%d"),
+            "modal_price": round_or_none(row.get("avg_modal")),
+            "min_price": row.get("min_price"),
+            "max_price": row.get("max_price"),
+            "rolling_7d_modal": round_or_none(row.get("rolling_7d_modal")),
+            "rolling_30d_modal": round_or_none(row.get("rolling_30d_modal")),
+            "band_7d_min": row.get("band_7d_min"),
+            "band_7d_max": row.get("band_7d_max"),
+            "wow_change_pct": round_or_none(row.get("wow_change_pct")),
+        })
+
+    result = {"commodity": commodity, "days": days, "series": list(series.values())}
+    market_trend_cache.set(cache_key, result)
+    return result
 
 # ========== CONTACT ==========
 
@@ -699,34 +2391,91 @@ async def get_market_prices():
 async def submit_contact(message: ContactMessageCreate):
     msg_obj = ContactMessage(**message.model_dump())
     doc = msg_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     await db.contact_messages.insert_one(doc)
     return msg_obj
 
 @api_router.get("/contact", response_model=List[ContactMessage])
-async def get_contact_messages():
-    messages = await db.contact_messages.find({}, {"_id": 0}).to_list(100)
-    for msg in messages:
-        if isinstance(msg.get('created_at'), str):
-            msg['created_at'] = datetime.fromisoformat(msg['created_at'])
-    return [ContactMessage(**m) for m in messages]
+async def get_contact_messages(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None
+):
+    messages, next_cursor = await fetch_page(
+        db.contact_messages, {}, model_projection(ContactMessage), limit, cursor
+    )
+    return documents_response(messages, next_cursor)
 
 # ========== ADMIN STATS ==========
 
-@api_router.get("/admin/stats")
-async def get_admin_stats():
-    user_count = await db.users.count_documents({})
-    report_count = await db.disease_reports.count_documents({})
-    message_count = await db.contact_messages.count_documents({})
-    calendar_count = await db.crop_calendar.count_documents({})
-    
+ADMIN_STATS_TTL = int(os.environ.get("ADMIN_STATS_TTL", 60))
+ADMIN_STATS_DAYS = 30
+
+admin_stats_cache = TTLCache(ttl=ADMIN_STATS_TTL, max_size=1)
+admin_stats_flight = SingleFlight()
+
+
+def count_by(field) -> list:
+    return [
+        {"$group": {"_id": field, "count": {"$sum": 1}}},
+        {"$sort": {"count": -1}},
+    ]
+
+
+async def compute_admin_stats() -> dict:
+    since = datetime.now(timezone.utc) - timedelta(days=ADMIN_STATS_DAYS)
+    recent = {"$match": {"created_at": {"$gte": since}}}
+    # One pass over the reports for every breakdown; the other totals come
+    # from collection metadata and run concurrently with it.
+    report_facets, user_count, message_count, calendar_count = await asyncio.gather(
+        db.disease_reports.aggregate([{"$facet": {
+            "total": [{"$count": "count"}],
+            "by_crop": count_by("$crop_name"),
+            "by_disease": count_by({"crop": "$crop_name", "disease": "$disease_name"}),
+            "by_severity": count_by("$severity"),
+            "daily_uploads": [
+                recent,
+                {"$group": {
+                    "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+                    "count": {"$sum": 1},
+                }},
+                {"$sort": {"_id": 1}},
+            ],
+            "active_users": [recent, {"$group": {"_id": "$user_id"}}, {"$count": "count"}],
+        }}]).to_list(1),
+        db.users.estimated_document_count(),
+        db.contact_messages.estimated_document_count(),
+        db.crop_calendar.estimated_document_count(),
+    )
+    facets = report_facets[0]
+
+    def single(name):
+        return facets[name][0]["count"] if facets[name] else 0
+
     return {
         "total_users": user_count,
-        "total_reports": report_count,
+        "total_reports": single("total"),
         "total_messages": message_count,
-        "total_calendar_entries": calendar_count
+        "total_calendar_entries": calendar_count,
+        "reports_by_crop": [{"crop": f["_id"], "count": f["count"]} for f in facets["by_crop"]],
+        "reports_by_disease": [
+            {"crop": f["_id"].get("crop"), "disease": f["_id"].get("disease"), "count": f["count"]}
+            for f in facets["by_disease"]
+        ],
+        "reports_by_severity": [{"severity": f["_id"], "count": f["count"]} for f in facets["by_severity"]],
+        "daily_uploads": [{"date": f["_id"], "count": f["count"]} for f in facets["daily_uploads"]],
+        "active_users": single("active_users"),
+        "window_days": ADMIN_STATS_DAYS,
+        "generated_at": datetime.now(timezone.utc).isoformat(),
     }
 
+
+@api_router.get("/admin/stats")
+async def get_admin_stats():
+    stats = admin_stats_cache.get("stats")
+    if stats is None:
+        stats = await admin_stats_flight.do("stats", compute_admin_stats)
+        admin_stats_cache.set("stats", stats)
+    return stats
+
 # ========== FARMING RESOURCES ==========
 
 @api_router.get("/resources/tools")
@@ -0,0 +1,123 @@
+import time
+import logging
+
+import httpx
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling an upstream that has been failing."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} circuit is open")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures.
+
+    While open every call fails fast; after `reset_timeout` seconds a single
+    trial call is let through (half-open) and its outcome closes or re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = "half_open"
+        if self.state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def retry_after(self) -> float:
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def release_trial(self):
+        """Give up a half-open trial without an outcome, so the next call can try again."""
+        self._trial_in_flight = False
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+
+class UpstreamClient:
+    """Long-lived, pooled HTTP client for one upstream API, guarded by a circuit breaker."""
+
+    def __init__(self, name: str, timeout: float, limits: httpx.Limits,
+                 failure_threshold: int = 5, reset_timeout: float = 30):
+        self.name = name
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=timeout,
+            limits=limits,
+        )
+        self.requests = 0
+        self.failures = 0
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        if not self.breaker.allow():
+            raise CircuitOpen(self.name, self.breaker.retry_after())
+        self.requests += 1
+        try:
+            response = await self.client.get(url, **kwargs)
+        except BaseException as e:
+            # Anything else (cancellation included) must still release a half-open trial.
+            if isinstance(e, Exception):
+                self.failures += 1
+                self.breaker.record_failure()
+            else:
+                self.breaker.release_trial()
+            raise
+        if response.status_code >= 500 or response.status_code == 429:
+            self.failures += 1
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    def stats(self) -> dict:
+        return {
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "requests": self.requests,
+            "failures": self.failures,
+            "http2": HTTP2_AVAILABLE,
+        }
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+def build_upstreams(config: dict, limits: httpx.Limits, failure_threshold: int, reset_timeout: float) -> dict:
+    clients = {
+        name: UpstreamClient(name, timeout, limits, failure_threshold, reset_timeout)
+        for name, timeout in config.items()
+    }
+    logging.getLogger(__name__).info(
+        f"Upstream clients ready: {', '.join(clients)} (http2={'on' if HTTP2_AVAILABLE else 'off'})"
+    )
+    return clients
@@ -193,6 +193,188 @@ class SmartFarmerAPITester:
         """Test admin statistics API"""
         return self.run_test("Admin Statistics", "GET", "admin/stats", 200)
 
+    def check(self, name, passed, detail=""):
+        """Record the outcome of a test that inspects more than the status code"""
+        self.tests_run += 1
+        if passed:
+            self.tests_passed += 1
+            self.passed_tests.append(name)
+            print(f"✅ {name}")
+        else:
+            print(f"❌ {name} - {detail}")
+            self.failed_tests.append({"test": name, "error": detail})
+        return passed
+
+    def test_readiness_and_metrics(self):
+        """Readiness is 200 when models are loaded and 503 while they load or the sidecar is down"""
+        response = requests.get(f"{self.base_url}/api/ready", timeout=30)
+        body = response.json()
+        success1 = self.check(
+            "Readiness Check",
+            response.status_code == (200 if body.get("ready") else 503) and "models" in body,
+            f"status {response.status_code}, body {str(body)[:200]}"
+        )
+        success2, metrics = self.run_test("Metrics", "GET", "metrics", 200)
+        success2 = success2 and self.check(
+            "Metrics Sections",
+            all(key in metrics for key in ("inference", "recommendation_cache", "upstreams")),
+            str(metrics)[:200]
+        )
+        return success1 and success2
+
+    def test_batch_disease_detection(self):
+        """Upload several images in one request and read the NDJSON result stream"""
+        files = [('images', (f'batch_{i}.jpg', self.create_test_image(), 'image/jpeg')) for i in range(3)]
+        response = requests.post(
+            f"{self.base_url}/api/detect-disease/batch",
+            data={'user_id': f'batch_user_{datetime.now().strftime("%H%M%S")}'},
+            files=files,
+            stream=True,
+            timeout=120
+        )
+        if not self.check("Batch Disease Detection", response.status_code == 200,
+                          f"status {response.status_code}, body {response.text[:200]}"):
+            return False
+        lines = [json.loads(line) for line in response.iter_lines() if line]
+        results, summary = lines[:-1], lines[-1] if lines else {}
+        return self.check(
+            "Batch Disease Detection Results",
+            summary.get("done") is True and summary.get("total") == 3
+            and sorted(r["index"] for r in results) == [0, 1, 2]
+            and summary.get("succeeded") == sum(1 for r in results if r["success"]),
+            str(lines)[:300]
+        )
+
+    def test_detection_jobs(self):
+        """Submit a detection job, poll it, and follow its event stream to the end"""
+        success, job = self.run_test(
+            "Submit Detection Job", "POST", "detect-disease/jobs", 202,
+            data={'user_id': f'job_user_{datetime.now().strftime("%H%M%S")}'},
+            files={'image': ('job.jpg', self.create_test_image(), 'image/jpeg')}
+        )
+        if not success:
+            return False
+        job_id = job["job_id"]
+        success1, status = self.run_test("Get Detection Job", "GET", f"detect-disease/jobs/{job_id}", 200)
+        success1 = success1 and self.check(
+            "Detection Job Status",
+            status.get("status") in ("queued", "running", "done", "failed"),
+            str(status)[:200]
+        )
+        success2, _ = self.run_test("Get Missing Detection Job", "GET", "detect-disease/jobs/no-such-job", 404)
+
+        final = None
+        with requests.get(f"{self.base_url}/api/detect-disease/jobs/{job_id}/events", stream=True, timeout=120) as events:
+            for line in events.iter_lines(decode_unicode=True):
+                if line and line.startswith("data: "):
+                    final = json.loads(line[len("data: "):])
+        success3 = self.check(
+            "Detection Job Events",
+            final is not None and final.get("status") in ("done", "failed"),
+            str(final)[:200]
+        )
+        return success1 and success2 and success3
+
+    def test_market_price_cursor(self):
+        """Test that malformed market price cursors are rejected"""
+        success, _ = self.run_test("Market Prices Bad Cursor", "GET", "market-prices?cursor=bm90LWEtY3Vyc29y", 400)
+        return success
+
+    def test_market_price_trends(self):
+        """Test market price trends"""
+        success, trends = self.run_test("Market Price Trends", "GET", "market-prices/trends?commodity=Wheat&days=30", 200)
+        success = success and self.check(
+            "Market Price Trends Shape",
+            trends.get("commodity") == "Wheat" and isinstance(trends.get("series"), list),
+            str(trends)[:200]
+        )
+        return success
+
+    def test_cursor_pagination(self):
+        """Page through users one at a time using the X-Next-Cursor header"""
+        stamp = datetime.now().strftime('%H%M%S%f')
+        for i in range(2):
+            self.run_test(f"Create Paging User {i}", "POST", "users", 200, {
+                "firebase_uid": f"paging_user_{stamp}_{i}",
+                "email": f"paging_{stamp}_{i}@example.com",
+                "display_name": "Paging User",
+                "role": "user"
+            })
+
+        first = requests.get(f"{self.base_url}/api/users?limit=1", timeout=30)
+        cursor = first.headers.get("X-Next-Cursor")
+        if not self.check("Users First Page", first.status_code == 200 and len(first.json()) == 1 and cursor,
+                          f"status {first.status_code}, cursor {cursor}"):
+            return False
+        second = requests.get(f"{self.base_url}/api/users", params={"limit": 1, "cursor": cursor}, timeout=30)
+        page1, page2 = first.json(), second.json() if second.status_code == 200 else []
+        success1 = self.check(
+            "Users Next Page",
+            len(page2) == 1 and page2[0]["id"] != page1[0]["id"],
+            f"status {second.status_code}, body {second.text[:200]}"
+        )
+        success2, _ = self.run_test("Users Bad Cursor", "GET", "users?cursor=bm90LWEtY3Vyc29y", 400)
+        return success1 and success2
+
+    def test_report_images(self):
+        """Fetch a stored report image whole, by range, and conditionally"""
+        user_id = f'image_user_{datetime.now().strftime("%H%M%S")}'
+        success, _ = self.run_test(
+            "Disease Detection For Image", "POST", "detect-disease", 200,
+            data={'user_id': user_id},
+            files={'image': ('image.jpg', self.create_test_image(), 'image/jpeg')}
+        )
+        success, reports = self.run_test("Get Image Reports", "GET", f"disease-reports/{user_id}", 200)
+        image_id = reports[0].get("image_id") if success and reports else None
+        if not self.check("Report Has Image", bool(image_id), str(reports)[:200]):
+            return False
+
+        url = f"{self.base_url}/api/images/{image_id}"
+        full = requests.get(url, timeout=30)
+        etag = full.headers.get("ETag")
+        success1 = self.check(
+            "Get Image",
+            full.status_code == 200 and full.content[:3] == b"\xff\xd8\xff" and etag == f'"{image_id}"',
+            f"status {full.status_code}, etag {etag}"
+        )
+        part = requests.get(url, headers={"Range": "bytes=0-9"}, timeout=30)
+        success2 = self.check(
+            "Get Image Range",
+            part.status_code == 206 and part.content == full.content[:10]
+            and part.headers.get("Content-Range") == f"bytes 0-9/{len(full.content)}",
+            f"status {part.status_code}, content-range {part.headers.get('Content-Range')}"
+        )
+        unsatisfiable = requests.get(url, headers={"Range": f"bytes={len(full.content)}-"}, timeout=30)
+        success3 = self.check("Get Image Unsatisfiable Range", unsatisfiable.status_code == 416,
+                              f"status {unsatisfiable.status_code}")
+        ignored = requests.get(url, headers={"Range": "bytes=0-1,5-6"}, timeout=30)
+        success4 = self.check(
+            "Get Image Ignored Range",
+            ignored.status_code == 200 and ignored.content == full.content,
+            f"status {ignored.status_code}"
+        )
+        cached = requests.get(url, headers={"If-None-Match": etag}, timeout=30)
+        success5 = self.check("Get Image Not Modified", cached.status_code == 304, f"status {cached.status_code}")
+        success6, _ = self.run_test("Get Missing Image", "GET", f"images/{'0' * 64}", 404)
+        return success1 and success2 and success3 and success4 and success5 and success6
+
+    def test_disease_heatmap(self):
+        """Test disease heatmap bounding box queries"""
+        success1, heatmap = self.run_test(
+            "Disease Heatmap", "GET",
+            "disease-reports/heatmap?min_lat=20&min_lng=70&max_lat=30&max_lng=80", 200
+        )
+        success1 = success1 and self.check(
+            "Disease Heatmap Shape",
+            isinstance(heatmap.get("cells"), list) and "grid_degrees" in heatmap,
+            str(heatmap)[:200]
+        )
+        success2, _ = self.run_test(
+            "Disease Heatmap Inverted Box", "GET",
+            "disease-reports/heatmap?min_lat=30&min_lng=70&max_lat=20&max_lng=80", 400
+        )
+        return success1 and success2
+
     def run_all_tests(self):
         """Run all API tests"""
         print("🚀 Starting Smart Farmer Portal API Tests")
@@ -204,15 +386,23 @@ class SmartFarmerAPITester:
         self.test_market_prices_endpoint()
         self.test_news_endpoint()
         self.test_policies_endpoint()
+        self.test_readiness_and_metrics()
+        self.test_market_price_cursor()
+        self.test_market_price_trends()
         
         # Resources tests
         self.test_resources_endpoints()
         
         # User management tests
         self.test_user_management()
+        self.test_cursor_pagination()
         
         # Disease detection test
         self.test_disease_detection()
+        self.test_batch_disease_detection()
+        self.test_detection_jobs()
+        self.test_report_images()
+        self.test_disease_heatmap()
         
         # Contact form test
         self.test_contact_form()
@@ -0,0 +1,74 @@
+import asyncio
+import json
+
+from body_limit import BodySizeLimit
+
+LIMITS = {"/upload": (10, "Too large")}
+
+
+async def reading_app(scope, receive, send):
+    """Reads the whole body, then echoes its length."""
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            break
+    payload = str(len(body)).encode()
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": payload})
+
+
+async def parse_error_app(scope, receive, send):
+    """Turns a failed body read into a 400, like FastAPI's form parsing does."""
+    try:
+        await reading_app(scope, receive, send)
+    except Exception:
+        await send({"type": "http.response.start", "status": 400, "headers": []})
+        await send({"type": "http.response.body", "body": b"There was an error parsing the body"})
+
+
+def call(app, path, chunks, content_length=None):
+    headers = [] if content_length is None else [(b"content-length", str(content_length).encode())]
+    scope = {"type": "http", "path": path, "headers": headers}
+    messages = [{"type": "http.request", "body": c, "more_body": i < len(chunks) - 1} for i, c in enumerate(chunks)]
+    reads = []
+    sent = []
+
+    async def receive():
+        reads.append(1)
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(BodySizeLimit(app, LIMITS)(scope, receive, send))
+    status = sent[0]["status"]
+    body = b"".join(m.get("body", b"") for m in sent[1:])
+    return status, body, len(reads)
+
+
+def test_small_body_passes_through():
+    assert call(reading_app, "/upload", [b"12345", b"678"]) == (200, b"8", 2)
+
+
+def test_declared_oversize_is_rejected_before_reading():
+    status, body, reads = call(reading_app, "/upload", [b"x" * 20], content_length=20)
+    assert (status, reads) == (413, 0)
+    assert json.loads(body) == {"detail": "Too large"}
+
+
+def test_streamed_oversize_stops_reading_at_the_limit():
+    status, body, reads = call(reading_app, "/upload", [b"x" * 6, b"x" * 6, b"x" * 6])
+    assert (status, reads) == (413, 2)
+    assert json.loads(body) == {"detail": "Too large"}
+
+
+def test_app_error_response_is_replaced_with_413():
+    status, body, _ = call(parse_error_app, "/upload", [b"x" * 6, b"x" * 6, b"x" * 6])
+    assert status == 413
+    assert json.loads(body) == {"detail": "Too large"}
+
+
+def test_other_paths_are_not_limited():
+    assert call(reading_app, "/other", [b"x" * 20], content_length=20)[:2] == (200, b"20")
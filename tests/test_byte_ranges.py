@@ -0,0 +1,45 @@
+import pytest
+
+from byte_ranges import RangeNotSatisfiable, parse_range
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-9", (0, 9)),
+    ("bytes=10-", (10, 99)),
+    ("bytes=-10", (90, 99)),
+    ("bytes=-500", (0, 99)),
+    ("bytes=90-500", (90, 99)),
+    ("BYTES = 5-5", (5, 5)),
+])
+def test_satisfiable_ranges(header, expected):
+    assert parse_range(header, 100) == expected
+
+
+@pytest.mark.parametrize("header", [
+    "bytes=100-",
+    "bytes=150-200",
+    "bytes=-0",
+])
+def test_unsatisfiable_ranges(header):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range(header, 100)
+
+
+@pytest.mark.parametrize("header", [
+    "bytes=0-1,5-6",
+    "items=0-9",
+    "bytes=a-b",
+    "bytes=-",
+    "bytes=9-0",
+    "bytes=--5",
+    "bytes",
+])
+def test_unsupported_or_malformed_ranges_are_ignored(header):
+    assert parse_range(header, 100) is None
+
+
+def test_empty_blob_has_no_satisfiable_range():
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range("bytes=0-", 0)
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range("bytes=-1", 0)
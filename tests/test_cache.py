@@ -0,0 +1,171 @@
+import asyncio
+
+import pytest
+
+from cache import PerceptualHashCache, SingleFlight, StaleWhileRevalidateCache, TTLCache
+
+
+def test_ttl_cache_expires_and_counts(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("cache.time.monotonic", lambda: now[0])
+    cache = TTLCache(ttl=10)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    now[0] += 10
+    assert cache.get("a") is None
+    assert len(cache) == 0
+    assert cache.stats() == {"size": 0, "hits": 1, "misses": 1, "hit_rate": 0.5}
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(ttl=60, max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_phash_cache_exact_then_similar_lookup():
+    cache = PerceptualHashCache(max_size=8, max_distance=4)
+    cache.set("digest-a", 0b1111_0000, "rust")
+    cache.set("digest-b", 0xFFFF_0000_0000_0000, "blight")
+    assert cache.get_exact("digest-a") == "rust"
+    assert cache.get_exact("digest-c") is None
+    # Three bits away from digest-a's hash, far from digest-b's.
+    assert cache.get_similar(0b1111_0111) == "rust"
+    assert cache.get_similar(0x0F0F_0F0F) is None
+    stats = cache.stats()
+    assert (stats["exact_hits"], stats["similar_hits"], stats["misses"]) == (1, 1, 1)
+
+
+def test_phash_cache_prefers_closest_hash():
+    cache = PerceptualHashCache(max_distance=4)
+    cache.set("far", 0b1110, "far")
+    cache.set("near", 0b0001, "near")
+    assert cache.get_similar(0b0000) == "near"
+
+
+def test_phash_cache_evicts_least_recently_used():
+    cache = PerceptualHashCache(max_size=2)
+    cache.set("a", 1, "a")
+    cache.set("b", 2, "b")
+    cache.get_exact("a")
+    cache.set("c", 3, "c")
+    assert cache.get_exact("b") is None
+    assert cache.stats()["size"] == 2
+
+
+def test_single_flight_collapses_concurrent_calls():
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    async def main():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.do("k", load) for _ in range(5)))
+        assert "k" not in flight
+        return results
+
+    assert asyncio.run(main()) == [1] * 5
+    assert calls == 1
+
+
+def make_swr_cache(monkeypatch, **kwargs):
+    now = [1000.0]
+    monkeypatch.setattr("cache.time.monotonic", lambda: now[0])
+    loads = []
+
+    async def loader(key):
+        loads.append(key)
+        return f"{key}-{len(loads)}"
+
+    cache = StaleWhileRevalidateCache(loader, ttl=10, stale_ttl=20, **kwargs)
+    return cache, now, loads
+
+
+def test_swr_cache_serves_stale_then_refreshes(monkeypatch):
+    cache, now, loads = make_swr_cache(monkeypatch)
+
+    async def main():
+        assert await cache.get("k") == "k-1"
+        assert await cache.get("k") == "k-1"
+        now[0] += 15
+        # Stale: the old value comes back at once and one refresh starts.
+        assert await cache.get("k") == "k-1"
+        assert await cache.get("k") == "k-1"
+        await asyncio.gather(*cache._refresh_tasks)
+        return await cache.get("k")
+
+    assert asyncio.run(main()) == "k-2"
+    assert loads == ["k", "k"]
+    assert cache.stats()["stale_hits"] == 2
+
+
+def test_swr_cache_reloads_after_stale_window(monkeypatch):
+    cache, now, loads = make_swr_cache(monkeypatch)
+
+    async def main():
+        await cache.get("k")
+        now[0] += 30
+        return await cache.get("k")
+
+    assert asyncio.run(main()) == "k-2"
+    assert cache.stats()["misses"] == 2
+
+
+def test_swr_cache_falls_back_to_expired_value_on_error(monkeypatch):
+    cache, now, loads = make_swr_cache(monkeypatch)
+
+    async def failing(key):
+        raise RuntimeError("upstream down")
+
+    async def main():
+        await cache.get("k")
+        now[0] += 30
+        cache.loader = failing
+        return await cache.get("k")
+
+    assert asyncio.run(main()) == "k-1"
+
+
+def test_swr_cache_raises_on_error_without_a_value():
+    async def failing(key):
+        raise RuntimeError("upstream down")
+
+    cache = StaleWhileRevalidateCache(failing, ttl=10, stale_ttl=20)
+    with pytest.raises(RuntimeError):
+        asyncio.run(cache.get("k"))
+
+
+def test_swr_cache_collapses_concurrent_misses(monkeypatch):
+    cache, now, loads = make_swr_cache(monkeypatch)
+
+    async def main():
+        return await asyncio.gather(*(cache.get("k") for _ in range(5)))
+
+    assert asyncio.run(main()) == ["k-1"] * 5
+    assert loads == ["k"]
+
+
+def test_swr_cache_tracks_hottest_keys_and_evicts(monkeypatch):
+    cache, now, loads = make_swr_cache(monkeypatch, max_size=2)
+
+    async def main():
+        for key in ["a", "b", "b", "c", "c", "c"]:
+            await cache.get(key)
+
+    asyncio.run(main())
+    assert cache.hottest(2) == ["c", "b"]
+    assert cache.expires_within("a", 0)
+    assert not cache.expires_within("c", 5)
+    cache.decay_heat()
+    assert sorted(cache.hottest(5)) == ["b", "c"]
+    cache.decay_heat()
+    assert cache.hottest(5) == []
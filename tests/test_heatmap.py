@@ -0,0 +1,30 @@
+import pytest
+
+from heatmap import cell_corner, heat_cell
+
+
+@pytest.mark.parametrize("lat, lng, expected", [
+    (21.2, 72.8, (212, 728)),
+    (19.3, 0.3, (193, 3)),
+    (28.6, 77.2, (286, 772)),
+    (21.25, 72.89, (212, 728)),
+    (21.2999, 72.8001, (212, 728)),
+])
+def test_boundary_points_stay_in_their_own_cell(lat, lng, expected):
+    assert heat_cell(lat, lng, 0.1) == expected
+
+
+def test_southern_and_western_points_floor_away_from_zero():
+    assert heat_cell(-0.05, -0.05, 0.1) == (-1, -1)
+    assert heat_cell(-33.9, -70.6, 0.1) == (-339, -706)
+
+
+def test_cell_corner_converts_back_to_degrees():
+    row, col = heat_cell(21.25, 72.89, 0.1)
+    assert (cell_corner(row, 0.1), cell_corner(col, 0.1)) == (21.2, 72.8)
+    assert cell_corner(-339, 0.1) == -33.9
+
+
+def test_other_grid_sizes():
+    assert heat_cell(21.5, 72.75, 0.25) == (86, 291)
+    assert heat_cell(21.2, 72.8, 1) == (21, 72)
@@ -0,0 +1,37 @@
+import hashlib
+import io
+
+import pytest
+
+pytest.importorskip("numpy")
+Image = pytest.importorskip("PIL.Image")
+
+from imaging import file_digest, preprocess_image
+
+
+def png_bytes(color):
+    out = io.BytesIO()
+    Image.new("RGB", (32, 32), color).save(out, "PNG")
+    return out.getvalue()
+
+
+def test_file_digest_hashes_a_file_left_at_eof():
+    data = png_bytes("green")
+    fileobj = io.BytesIO(data)
+    fileobj.read()
+    assert file_digest(fileobj, chunk_size=7) == hashlib.sha256(data).hexdigest()
+    assert fileobj.tell() == 0
+
+
+def test_file_digest_tells_apart_files_with_the_same_tail():
+    # Every PNG ends in the same IEND chunk, so hashing only the tail collides.
+    first, second = io.BytesIO(png_bytes("green")), io.BytesIO(png_bytes("brown"))
+    first.seek(-12, io.SEEK_END)
+    second.seek(-12, io.SEEK_END)
+    assert file_digest(first) != file_digest(second)
+
+
+def test_preprocess_image_returns_target_size_rgb():
+    image = preprocess_image(io.BytesIO(png_bytes("green")))
+    assert image.shape == (224, 224, 3)
+    assert image.dtype.name == "uint8"
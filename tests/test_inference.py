@@ -0,0 +1,143 @@
+import asyncio
+import threading
+
+import pytest
+
+from inference import (
+    InferenceExecutor, InferenceSaturated, InferenceUnavailable, MicroBatcher, SidecarClient, read_frame,
+)
+
+
+def test_executor_rejects_beyond_max_queue():
+    release = threading.Event()
+
+    async def main():
+        executor = InferenceExecutor(max_workers=1, max_queue=2, retry_after=7)
+        try:
+            running = [asyncio.ensure_future(executor.run(release.wait)) for _ in range(2)]
+            await asyncio.sleep(0)
+            with pytest.raises(InferenceSaturated) as exc:
+                await executor.run(release.wait)
+            assert exc.value.retry_after == 7
+            release.set()
+            await asyncio.gather(*running)
+            return executor.stats()
+        finally:
+            release.set()
+            executor.shutdown()
+
+    stats = asyncio.run(main())
+    assert stats["rejected"] == 1
+    assert stats["completed"] == 2
+    assert stats["queue_depth"] == 0
+
+
+def test_micro_batcher_groups_concurrent_submits():
+    seen = []
+
+    def forward(items):
+        seen.append(list(items))
+        return [item * 10 for item in items]
+
+    async def main():
+        executor = InferenceExecutor(max_workers=1, max_queue=4)
+        batcher = MicroBatcher(executor, forward, max_batch=4, max_wait_ms=50)
+        try:
+            results = await asyncio.gather(*(batcher.submit(i) for i in range(6)))
+            return results, batcher.stats()
+        finally:
+            await batcher.stop()
+            executor.shutdown()
+
+    results, stats = asyncio.run(main())
+    assert results == [0, 10, 20, 30, 40, 50]
+    assert sorted(len(batch) for batch in seen) == [2, 4]
+    assert stats["batches"] == 2
+    assert stats["items"] == 6
+    assert stats["batch_size_histogram"] == {2: 1, 4: 1}
+
+
+def test_micro_batcher_fails_every_item_when_forward_fails():
+    def forward(items):
+        raise RuntimeError("model exploded")
+
+    async def main():
+        executor = InferenceExecutor(max_workers=1, max_queue=4)
+        batcher = MicroBatcher(executor, forward, max_batch=4, max_wait_ms=20)
+        try:
+            return await asyncio.gather(*(batcher.submit(i) for i in range(3)), return_exceptions=True)
+        finally:
+            await batcher.stop()
+            executor.shutdown()
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_micro_batcher_rejects_when_too_many_pending():
+    release = threading.Event()
+
+    def forward(items):
+        release.wait()
+        return items
+
+    async def main():
+        executor = InferenceExecutor(max_workers=1, max_queue=1, retry_after=3)
+        batcher = MicroBatcher(executor, forward, max_batch=1, max_wait_ms=0, max_pending=1)
+        try:
+            first = asyncio.ensure_future(batcher.submit(1))
+            await asyncio.sleep(0)
+            with pytest.raises(InferenceSaturated):
+                await batcher.submit(2)
+            release.set()
+            return await first
+        finally:
+            release.set()
+            await batcher.stop()
+            executor.shutdown()
+
+    assert asyncio.run(main()) == 1
+
+
+def run_against_sidecar(tmp_path, handle, timeout=5):
+    """Send one status request to a fake sidecar that runs `handle(reader, writer)`."""
+    path = str(tmp_path / "sidecar.sock")
+
+    async def main():
+        server = await asyncio.start_unix_server(handle, path)
+        client = SidecarClient(path, retry_after=9, timeout=timeout)
+        try:
+            return await client.status()
+        finally:
+            await client.close()
+            server.close()
+
+    return asyncio.run(main())
+
+
+def test_sidecar_client_reports_unavailable_when_sidecar_dies_mid_request(tmp_path):
+    async def die(reader, writer):
+        await read_frame(reader)
+        writer.close()
+
+    with pytest.raises(InferenceUnavailable) as exc:
+        run_against_sidecar(tmp_path, die)
+    assert exc.value.retry_after == 9
+
+
+def test_sidecar_client_reports_unavailable_when_sidecar_hangs(tmp_path):
+    async def hang(reader, writer):
+        await read_frame(reader)
+        await asyncio.sleep(1)
+
+    with pytest.raises(InferenceUnavailable):
+        run_against_sidecar(tmp_path, hang, timeout=0.05)
+
+
+def test_sidecar_client_reports_unavailable_when_socket_is_missing(tmp_path):
+    async def main():
+        client = SidecarClient(str(tmp_path / "missing.sock"), retry_after=9)
+        await client.status()
+
+    with pytest.raises(InferenceUnavailable):
+        asyncio.run(main())
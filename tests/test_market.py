@@ -0,0 +1,50 @@
+from datetime import datetime, timezone
+
+from market import market_row_changed, normalize_market_record
+
+RECORD = {
+    "state": "Gujarat",
+    "district": "Rajkot",
+    "market": "Gondal",
+    "commodity": "Groundnut",
+    "variety": "Bold",
+    "grade": "FAQ",
+    "arrival_date": "05/03/2024",
+    "min_price": "5500",
+    "max_price": "6000.5",
+    "modal_price": "5750",
+}
+
+
+def test_normalize_parses_dates_and_prices():
+    doc = normalize_market_record(RECORD)
+    assert doc["arrival_date"] == datetime(2024, 3, 5, tzinfo=timezone.utc)
+    assert (doc["min_price"], doc["max_price"], doc["modal_price"]) == (5500.0, 6000.5, 5750.0)
+    assert doc["commodity"] == "Groundnut"
+
+
+def test_normalize_keys_rows_by_natural_key_and_date():
+    doc = normalize_market_record(RECORD)
+    assert normalize_market_record({**RECORD, "modal_price": "5800"})["_id"] == doc["_id"]
+    assert normalize_market_record({**RECORD, "arrival_date": "06/03/2024"})["_id"] != doc["_id"]
+    assert normalize_market_record({**RECORD, "market": "Rajkot"})["_id"] != doc["_id"]
+
+
+def test_normalize_keeps_unparseable_prices_as_none():
+    doc = normalize_market_record({**RECORD, "min_price": "NR", "max_price": None})
+    assert doc["min_price"] is None and doc["max_price"] is None
+
+
+def test_normalize_skips_records_without_a_valid_date():
+    assert normalize_market_record({k: v for k, v in RECORD.items() if k != "arrival_date"}) is None
+    assert normalize_market_record({**RECORD, "arrival_date": "2024-03-05"}) is None
+    assert normalize_market_record({**RECORD, "arrival_date": None}) is None
+
+
+def test_row_changed_only_for_new_rows_or_moved_prices():
+    doc = normalize_market_record(RECORD)
+    stored = {"_id": doc["_id"], "min_price": 5500.0, "max_price": 6000.5, "modal_price": 5750.0}
+    assert market_row_changed(None, doc)
+    assert not market_row_changed(stored, doc)
+    assert market_row_changed({**stored, "modal_price": 5700.0}, doc)
+    assert market_row_changed({"_id": doc["_id"]}, doc)
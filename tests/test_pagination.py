@@ -0,0 +1,76 @@
+from datetime import datetime
+
+import pytest
+
+from pagination import InvalidCursor, cursor_after, decode_cursor, encode_cursor, keyset_after
+
+
+def test_cursor_round_trip_keeps_datetimes():
+    position = {"created_at": datetime(2024, 5, 1, 12, 30, 15, 250000), "id": "abc"}
+    cursor = encode_cursor(position)
+    assert "=" not in cursor
+    assert decode_cursor(cursor, {"created_at", "id"}) == position
+
+
+def test_cursor_round_trip_keeps_null_values():
+    assert decode_cursor(encode_cursor({"v": None, "id": "x"}), {"v", "id"}) == {"v": None, "id": "x"}
+
+
+def test_cursor_after_an_undated_last_row_pages_on_through_nulls():
+    page = [{"created_at": datetime(2024, 5, 1), "id": "c"}, {"id": "b"}]
+    position = decode_cursor(cursor_after(page[-1], "created_at", "id"), {"created_at", "id"})
+    assert position == {"created_at": None, "id": "b"}
+    assert keyset_after("created_at", position["created_at"], position["id"], -1, "id") == {
+        "$or": [{"created_at": None, "id": {"$lt": "b"}}]
+    }
+
+
+@pytest.mark.parametrize("cursor", ["", "not base64!", "bnVsbA", "WzFd", encode_cursor({"v": 1})])
+def test_decode_cursor_rejects_garbage_and_wrong_shapes(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, {"v", "id"})
+
+
+def test_decode_cursor_rejects_extra_keys():
+    with pytest.raises(InvalidCursor):
+        decode_cursor(encode_cursor({"v": 1, "id": "x", "extra": 2}), {"v", "id"})
+
+
+def test_encode_cursor_rejects_unserializable_values():
+    with pytest.raises(TypeError):
+        encode_cursor({"v": object(), "id": "x"})
+
+
+def test_keyset_after_descending_value_includes_trailing_nulls():
+    assert keyset_after("price", 10, "b", -1) == {"$or": [
+        {"price": 10, "_id": {"$lt": "b"}},
+        {"price": {"$lt": 10}},
+        {"price": None},
+    ]}
+
+
+def test_keyset_after_ascending_value():
+    assert keyset_after("price", 10, "b", 1, "id") == {"$or": [
+        {"price": 10, "id": {"$gt": "b"}},
+        {"price": {"$gt": 10}},
+    ]}
+
+
+def test_keyset_after_ascending_null_moves_on_to_values():
+    assert keyset_after("price", None, "b", 1) == {"$or": [
+        {"price": None, "_id": {"$gt": "b"}},
+        {"price": {"$ne": None}},
+    ]}
+
+
+def test_keyset_after_descending_null_stays_within_nulls():
+    assert keyset_after("price", None, "b", -1) == {"$or": [{"price": None, "_id": {"$lt": "b"}}]}
+
+
+def test_keyset_after_newest_first_pages_on_to_undated_rows():
+    created_at = datetime(2024, 5, 1)
+    assert keyset_after("created_at", created_at, "b", -1, "id") == {"$or": [
+        {"created_at": created_at, "id": {"$lt": "b"}},
+        {"created_at": {"$lt": created_at}},
+        {"created_at": None},
+    ]}
@@ -0,0 +1,42 @@
+import pytest
+
+from recommendation import parse_recommendation, validate_recommendation
+
+VALID = {
+    "cause": "Fungal spores",
+    "symptoms": ["Brown spots", "Yellowing"],
+    "treatment": "Remove infected leaves",
+    "recommended_fertilizer": "NPK 10-26-26",
+    "recommended_medicine": "Mancozeb",
+    "severity": "Medium",
+}
+
+
+def test_validate_keeps_only_report_fields():
+    info = validate_recommendation({**VALID, "extra": "dropped"})
+    assert info == VALID
+
+
+@pytest.mark.parametrize("info", [
+    None,
+    ["not", "a", "dict"],
+    {k: v for k, v in VALID.items() if k != "treatment"},
+    {**VALID, "severity": 3},
+    {**VALID, "symptoms": "Brown spots"},
+    {**VALID, "symptoms": ["Brown spots", None]},
+])
+def test_validate_rejects_missing_or_mistyped_fields(info):
+    with pytest.raises(ValueError):
+        validate_recommendation(info)
+
+
+def test_parse_strips_markdown_fences():
+    text = '```json\n{"cause": "Fungal spores", "symptoms": ["Brown spots", "Yellowing"], ' \
+           '"treatment": "Remove infected leaves", "recommended_fertilizer": "NPK 10-26-26", ' \
+           '"recommended_medicine": "Mancozeb", "severity": "Medium"}\n```'
+    assert parse_recommendation(text) == VALID
+
+
+def test_parse_rejects_invalid_json():
+    with pytest.raises(ValueError):
+        parse_recommendation("Sorry, I can't help with that.")
@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from upstream import CircuitBreaker, CircuitOpen, UpstreamClient  # noqa: E402
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("upstream.time.monotonic", lambda: now[0])
+    return now
+
+
+def test_breaker_opens_after_threshold(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    clock[0] += 10
+    assert breaker.retry_after() == 20
+
+
+def test_breaker_lets_one_trial_through_when_half_open(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock[0] += 30
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.failures == 0
+
+
+def test_breaker_reopens_when_trial_fails(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    for _ in range(3):
+        breaker.record_failure()
+    clock[0] += 30
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_released_trial_can_be_retried(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock[0] += 30
+    assert breaker.allow()
+    breaker.release_trial()
+    assert breaker.allow()
+
+
+def make_client(handler):
+    client = UpstreamClient("test", timeout=1, limits=httpx.Limits(), failure_threshold=1, reset_timeout=0)
+    client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+def test_client_opens_circuit_on_server_errors():
+    async def main():
+        client = make_client(lambda request: httpx.Response(503))
+        client.breaker.reset_timeout = 60
+        try:
+            await client.get("http://upstream/")
+            with pytest.raises(CircuitOpen):
+                await client.get("http://upstream/")
+            return client.stats()
+        finally:
+            await client.aclose()
+
+    stats = asyncio.run(main())
+    assert stats["circuit"] == "open"
+    assert stats["failures"] == 1
+
+
+def test_cancelled_trial_is_released():
+    async def slow(request):
+        await asyncio.sleep(10)
+        return httpx.Response(200)
+
+    async def main():
+        client = make_client(slow)
+        client.breaker.record_failure()
+        try:
+            task = asyncio.ensure_future(client.get("http://upstream/"))
+            await asyncio.sleep(0.01)
+            assert client.breaker.state == "half_open"
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            return client.breaker.allow()
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(main())